@@ -0,0 +1,271 @@
+"""End-to-end benchmark against an in-process fake PyPI and GitHub server.
+
+Generates a synthetic project (N PyPI dependencies, M workflow files and K pre-commit
+hook repositories) and serves the PyPI JSON API and GitHub releases from a local
+server with configurable latency, payload size and rate limit (see ``fakes.py``), so
+the results do not depend on the network or on real rate limits. Measures:
+
+- ``construct``: ``Project()`` construction, i.e. parsing all the project files
+- ``fetch-rest``: the fetch phase with one GitHub REST request per repository
+- ``fetch-graphql``: the fetch phase with batched GitHub GraphQL requests
+- ``needs-updating``: the ``needs-updating`` command, in a fresh interpreter
+- ``update``: the ``update`` command (commit, push and pull request), in a fresh
+  interpreter, on a git repository with a local remote
+
+Usage:
+    python benchmarks/end_to_end.py [--deps 60] [--workflows 10] [--hooks 10]
+        [--latency-ms 20] [--payload-kb 4] [--rate-limit N] [--runs 5]
+        [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from fakes import FakeServer, ServerConfig, make_project, pypi_name
+
+import upgrade_dependencies.utils as utils
+from upgrade_dependencies.project import Project
+
+DEFAULT_DEPS = 60
+DEFAULT_WORKFLOWS = 10
+DEFAULT_HOOKS = 10
+DEFAULT_LATENCY_MS = 20.0
+DEFAULT_PAYLOAD_KB = 4.0
+DEFAULT_RUNS = 5
+GH_PAT = "benchmark-token"  # only sent to the fake server
+REMOTE_URL = "https://github.com/benchmark/project.git"
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Benchmark",
+    "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+    "GIT_COMMITTER_NAME": "Benchmark",
+    "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+}
+
+
+def time_runs(
+    func: Callable[[], None],
+    runs: int,
+    setup: Callable[[], None] | None = None,
+) -> list[float]:
+    """Times a function.
+
+    Args:
+        func: Function to time
+        runs: Number of timed runs
+        setup: Function called before every run, not timed. Defaults to None.
+
+    Returns:
+        Duration of every run (in seconds)
+    """
+    durations: list[float] = []
+
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return durations
+
+
+def run_cli(args: list[str], cwd: Path, env: dict[str, str]) -> None:
+    """Runs the CLI in a fresh interpreter.
+
+    Args:
+        args: Command and arguments
+        cwd: Working directory
+        env: Environment variables added to the current environment
+
+    Raises:
+        RuntimeError: If the command failed
+    """
+    res = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "upgrade_dependencies", *args],
+        cwd=cwd,
+        env=os.environ | env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    if res.returncode != 0:
+        msg = f"{' '.join(args)} failed: {res.stdout}{res.stderr}"
+        raise RuntimeError(msg)
+
+
+def init_repo(path: Path) -> None:
+    """Turns the project into a git repository with a local remote.
+
+    The fetch URL of ``origin`` is a GitHub URL, so that pull requests are created
+    through the GitHub API (i.e. the fake server), while pushes go to a local bare
+    repository.
+
+    Args:
+        path: Directory of the project
+    """
+    remote = path.parent / "remote.git"
+
+    for args in [
+        ["git", "init", "--quiet", "--bare", str(remote)],
+        ["git", "init", "--quiet", "--initial-branch", "master", str(path)],
+        ["git", "-C", str(path), "add", "--all"],
+        ["git", "-C", str(path), "commit", "--quiet", "--message", "Initial commit"],
+        ["git", "-C", str(path), "remote", "add", "origin", REMOTE_URL],
+        ["git", "-C", str(path), "remote", "set-url", "--push", "origin", str(remote)],
+    ]:
+        utils.run_shell_command(args, env=GIT_IDENTITY)
+
+
+def delete_branches(path: Path) -> None:
+    """Deletes the branches created by ``update``, locally and on the remote.
+
+    Args:
+        path: Directory of the project
+    """
+    res = utils.run_shell_command(
+        ["git", "for-each-ref", "--format=%(refname:short)", "refs/heads/dependency"],
+        cwd=path,
+    )
+
+    for branch in res.stdout.split():
+        utils.run_shell_command(["git", "branch", "--quiet", "-D", branch], cwd=path)
+        utils.run_shell_command(
+            ["git", "push", "--quiet", "origin", "--delete", branch],
+            cwd=path,
+        )
+
+
+def main() -> int:
+    """Runs the benchmark.
+
+    Returns:
+        Exit status
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--deps", type=int, default=DEFAULT_DEPS)
+    parser.add_argument("--workflows", type=int, default=DEFAULT_WORKFLOWS)
+    parser.add_argument("--hooks", type=int, default=DEFAULT_HOOKS)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS)
+    parser.add_argument("--payload-kb", type=float, default=DEFAULT_PAYLOAD_KB)
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=None,
+        help="GitHub requests allowed per second, unlimited if not specified",
+    )
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--json", type=Path, default=None, help="Write results here")
+    args = parser.parse_args()
+
+    config = ServerConfig(
+        latency=args.latency_ms / 1000,
+        payload_size=int(args.payload_kb * 1024),
+        rate_limit=args.rate_limit,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeServer(config=config) as server:
+        path = Path(tmp_dir) / "project"
+        make_project(
+            path=path,
+            n_deps=args.deps,
+            n_workflows=args.workflows,
+            n_hooks=args.hooks,
+        )
+        init_repo(path=path)
+
+        def construct() -> None:
+            utils.yml_cache.clear()  # a fresh process has nothing cached
+            Project(project_path=str(path))
+
+        def fetch(gh_pat: str | None) -> Callable[[], None]:
+            def run() -> None:
+                project = Project(
+                    project_path=str(path),
+                    gh_pat=gh_pat,
+                    pypi_url=server.url,
+                    github_url=server.url,
+                )
+                project.fetch_all_data()
+
+            return run
+
+        cache_dirs: list[str] = []
+
+        def cli_env() -> dict[str, str]:
+            # a new cache directory for every run, i.e. always a cold cache
+            cache_dirs.append(tempfile.mkdtemp(dir=tmp_dir))
+
+            return GIT_IDENTITY | {
+                "GH_PAT": GH_PAT,
+                "GH_API_URL": server.url,
+                "PYPI_URL": server.url,
+                "XDG_CACHE_HOME": cache_dirs[-1],
+            }
+
+        scenarios: dict[str, tuple[Callable[[], None], Callable[[], None] | None]] = {
+            "construct": (construct, None),
+            "fetch-rest": (fetch(gh_pat=None), None),
+            "fetch-graphql": (fetch(gh_pat=GH_PAT), None),
+            "needs-updating": (
+                lambda: run_cli(args=["needs-updating"], cwd=path, env=cli_env()),
+                None,
+            ),
+            "update": (
+                lambda: run_cli(args=["update", pypi_name(0)], cwd=path, env=cli_env()),
+                lambda: delete_branches(path=path),
+            ),
+        }
+
+        print(
+            f"project: {args.deps} PyPI dependencies, {args.workflows} workflows, "
+            f"{args.hooks} pre-commit hooks",
+        )
+        print(
+            f"server: {args.latency_ms:g} ms latency, {args.payload_kb:g} KiB "
+            f"payload, rate limit {args.rate_limit or 'unlimited'}",
+        )
+
+        results: dict[str, Any] = {"config": vars(args)}
+
+        for name, (func, setup) in scenarios.items():
+            func()  # warm up
+            server.stats.requests.clear()
+            durations = time_runs(func=func, runs=args.runs, setup=setup)
+            requests = {
+                kind: count // args.runs
+                for kind, count in server.stats.requests.items()
+            }
+            results[name] = {
+                "median": statistics.median(durations),
+                "min": min(durations),
+                "requests": requests,
+            }
+            print(
+                f"{name:>16}: median {statistics.median(durations) * 1000:8.1f} ms, "
+                f"min {min(durations) * 1000:8.1f} ms, requests/run {requests}",
+            )
+
+        results["rate_limited"] = server.stats.rate_limited
+
+        if server.stats.rate_limited > 0:
+            print(f"rate limited requests: {server.stats.rate_limited}")
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2, default=str))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""Synthetic projects and an in-process fake PyPI/GitHub server for benchmarks."""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+OLD_VERSION = "1.0.0"
+NEW_VERSION = "2.0.0"
+PUBLISHED_AT = "2024-01-01T00:00:00Z"
+
+
+class Server(ThreadingHTTPServer):
+    """Threading HTTP server accepting many concurrent connections."""
+
+    # the default backlog of 5 drops connections when the client opens its whole
+    # pool at once, adding a TCP retransmission delay (~1 s) to the measurements
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def pypi_name(idx: int) -> str:
+    """Gets the name of a synthetic PyPI package.
+
+    Args:
+        idx: Index of the package
+
+    Returns:
+        Package name
+    """
+    return f"package-{idx}"
+
+
+def action_name(idx: int) -> str:
+    """Gets the owner/repo of a synthetic GitHub action.
+
+    Args:
+        idx: Index of the action
+
+    Returns:
+        Action repository
+    """
+    return f"actions-{idx}/action-{idx}"
+
+
+def hook_name(idx: int) -> str:
+    """Gets the owner/repo of a synthetic pre-commit hook repository.
+
+    Args:
+        idx: Index of the hook repository
+
+    Returns:
+        Hook repository
+    """
+    return f"hooks-{idx}/hook-{idx}"
+
+
+def make_project(
+    path: Path,
+    n_deps: int,
+    n_workflows: int,
+    n_hooks: int,
+    actions_per_workflow: int = 3,
+) -> None:
+    """Writes a synthetic project that uses the expected project file structure.
+
+    The PyPI dependencies are spread over the base dependencies, an optional
+    dependency group and a dependency group. Every workflow file uses
+    ``actions_per_workflow`` actions, shared between the workflows. All the
+    dependencies are pinned to ``OLD_VERSION`` (or ``v1``) so they all need updating.
+
+    Args:
+        path: Directory of the project, created if needed
+        n_deps: Number of PyPI dependencies
+        n_workflows: Number of GitHub workflow files
+        n_hooks: Number of pre-commit hook repositories
+        actions_per_workflow: Number of actions used by each workflow. Defaults to 3.
+    """
+    groups: list[list[str]] = [[], [], []]
+
+    for idx in range(n_deps):
+        groups[idx % 3].append(f'    "{pypi_name(idx)}~={OLD_VERSION}",')
+
+    base, optional, group = ("\n".join(deps) for deps in groups)
+    pyproject = f"""[project]
+name = "benchmark-project"
+version = "0.1.0"
+requires-python = ">=3.13"
+dependencies = [
+{base}
+]
+
+[project.optional-dependencies]
+extra = [
+{optional}
+]
+
+[dependency-groups]
+dev = [
+{group}
+]
+"""
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "pyproject.toml").write_text(pyproject)
+
+    workflows_dir = path / ".github" / "workflows"
+    workflows_dir.mkdir(parents=True, exist_ok=True)
+
+    for idx in range(n_workflows):
+        steps = "\n".join(
+            f"    - name: Step {step}\n      uses: {action_name(idx + step)}@v1"
+            for step in range(actions_per_workflow)
+        )
+        workflow = f"""name: Workflow {idx}
+
+on:
+  push:
+    branches:
+    - master
+
+jobs:
+  job:
+    runs-on: ubuntu-latest
+
+    steps:
+{steps}
+"""
+        (workflows_dir / f"workflow-{idx}.yml").write_text(workflow)
+
+    repos = "\n".join(
+        f"  - repo: https://github.com/{hook_name(idx)}\n"
+        f"    rev: v{OLD_VERSION}\n"
+        f"    hooks:\n"
+        f"      - id: hook-{idx}"
+        for idx in range(n_hooks)
+    )
+    (path / ".pre-commit-config.yaml").write_text(f"repos:\n{repos}\n")
+
+
+@dataclass
+class ServerConfig:
+    """Behaviour of the fake server.
+
+    Attributes:
+        latency: Delay (in seconds) before every response
+        payload_size: Size (in bytes) of the filler added to every release response,
+            after the fields the tool reads
+        rate_limit: Number of GitHub API requests allowed per window, unlimited if
+            None
+        rate_window: Length (in seconds) of a rate limit window
+    """
+
+    latency: float = 0.0
+    payload_size: int = 0
+    rate_limit: int | None = None
+    rate_window: float = 1.0
+
+
+@dataclass
+class ServerStats:
+    """Requests handled by the fake server.
+
+    Attributes:
+        requests: Number of requests by kind (e.g. ``pypi``, ``release``, ``graphql``)
+        rate_limited: Number of requests rejected by the rate limit
+    """
+
+    requests: dict[str, int] = field(default_factory=dict[str, int])
+    rate_limited: int = 0
+
+
+class FakeServer:
+    """In-process HTTP server emulating the PyPI JSON API and the GitHub API.
+
+    Every package and repository has the latest release ``NEW_VERSION``. Serves the
+    PyPI JSON API, GitHub latest releases (REST and GraphQL) and pull request creation,
+    with the rate limit headers the GitHub API sends. Runs in a background thread, use
+    as a context manager.
+    """
+
+    def __init__(
+        self,
+        config: ServerConfig | None = None,
+    ) -> None:
+        """Inits the FakeServer class.
+
+        Args:
+            config: Behaviour of the server, defaults if None. Defaults to None.
+        """
+        self.config = config or ServerConfig()
+        self.stats = ServerStats()
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.window_used = 0
+        self.filler = "x" * self.config.payload_size
+        self.server = Server(("127.0.0.1", 0), self.create_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server.server_address[:2]
+
+        return f"http://{host!s}:{port}"
+
+    def count(self, kind: str) -> None:
+        """Counts a request.
+
+        Args:
+            kind: Kind of request
+        """
+        with self.lock:
+            self.stats.requests[kind] = self.stats.requests.get(kind, 0) + 1
+
+    def take_rate_limit(self) -> dict[str, str] | None:
+        """Uses a request of the GitHub rate limit.
+
+        Returns:
+            Rate limit headers, None if the rate limit is exceeded
+        """
+        limit = self.config.rate_limit
+
+        if limit is None:
+            return {}
+
+        with self.lock:
+            now = time.time()
+
+            if now - self.window_start >= self.config.rate_window:
+                self.window_start = now
+                self.window_used = 0
+
+            reset = self.window_start + self.config.rate_window
+            headers = {
+                "x-ratelimit-limit": str(limit),
+                "x-ratelimit-reset": f"{reset:.3f}",
+            }
+
+            if self.window_used >= limit:
+                self.stats.rate_limited += 1
+                return None
+
+            self.window_used += 1
+            headers["x-ratelimit-remaining"] = str(limit - self.window_used)
+
+            return headers
+
+    def pypi_data(self, name: str) -> dict[str, Any]:
+        """Builds a PyPI JSON API document.
+
+        Args:
+            name: Package name
+
+        Returns:
+            Document, ``info`` first like the real API
+        """
+        return {
+            "info": {"name": name, "version": NEW_VERSION, "yanked": False},
+            "releases": {NEW_VERSION: [{"filler": self.filler}]},
+        }
+
+    def release_data(self) -> dict[str, Any]:
+        """Builds a GitHub latest release document.
+
+        Returns:
+            Document
+        """
+        return {
+            "tag_name": f"v{NEW_VERSION}",
+            "published_at": PUBLISHED_AT,
+            "body": self.filler,
+        }
+
+    def graphql_data(self, variables: dict[str, str]) -> dict[str, Any]:
+        """Builds the response to a batched latest release query.
+
+        Args:
+            variables: Query variables, ``o{idx}`` and ``n{idx}`` for each repository
+
+        Returns:
+            Response document
+        """
+        aliases = [key[1:] for key in variables if key.startswith("o")]
+        release = {"tagName": f"v{NEW_VERSION}", "publishedAt": PUBLISHED_AT}
+
+        return {
+            "data": {
+                f"r{idx}": {"latestRelease": release, "refs": {"nodes": []}}
+                for idx in aliases
+            },
+        }
+
+    def create_handler(self) -> type[BaseHTTPRequestHandler]:
+        """Creates the request handler class bound to this server.
+
+        Returns:
+            Request handler class
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+            def send_json(
+                self,
+                status: int,
+                data: Any,
+                headers: dict[str, str] | None = None,
+            ) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_json(self) -> Any:
+                length = int(self.headers.get("content-length", 0))
+
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def handle_github(self, kind: str, data: Any, status: int = 200) -> None:
+                fake.count(kind=kind)
+                headers = fake.take_rate_limit()
+
+                if headers is None:
+                    reset = fake.window_start + fake.config.rate_window
+                    self.send_json(
+                        status=403,
+                        data={"message": "API rate limit exceeded"},
+                        headers={
+                            "x-ratelimit-remaining": "0",
+                            "x-ratelimit-reset": f"{reset:.3f}",
+                        },
+                    )
+                    return
+
+                self.send_json(status=status, data=data, headers=headers)
+
+            def do_GET(self) -> None:
+                time.sleep(fake.config.latency)
+
+                if match := re.fullmatch(r"/pypi/([^/]+)/json", self.path):
+                    fake.count(kind="pypi")
+                    self.send_json(status=200, data=fake.pypi_data(match.group(1)))
+                elif re.fullmatch(r"/repos/[^/]+/[^/]+/releases/latest", self.path):
+                    self.handle_github(kind="release", data=fake.release_data())
+                elif self.path == "/user":
+                    self.handle_github(kind="user", data={"login": "benchmark"})
+                else:
+                    self.send_json(status=404, data={"message": "Not Found"})
+
+            def do_POST(self) -> None:
+                time.sleep(fake.config.latency)
+                data = self.read_json()
+
+                if self.path == "/graphql":
+                    self.handle_github(
+                        kind="graphql",
+                        data=fake.graphql_data(variables=data.get("variables", {})),
+                    )
+                elif re.fullmatch(r"/repos/[^/]+/[^/]+/pulls", self.path):
+                    number = sum(fake.stats.requests.values())
+                    self.handle_github(
+                        kind="pull",
+                        data={
+                            "number": number,
+                            "html_url": f"{fake.url}/pull/{number}",
+                        },
+                        status=201,
+                    )
+                else:
+                    self.send_json(status=404, data={"message": "Not Found"})
+
+            def do_PATCH(self) -> None:
+                time.sleep(fake.config.latency)
+                self.read_json()
+                self.handle_github(kind="issue", data={})
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeServer":
+        """Starts the server.
+
+        Returns:
+            Fake server
+        """
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Stops the server.
+
+        Args:
+            exc_info: Exception information
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,171 @@
+"""Import-time benchmark of the CLI, enforcing a start-up budget.
+
+Imports ``upgrade_dependencies.main`` in fresh interpreters with
+``python -X importtime`` and checks that:
+
+- the modules that are only needed by some commands (the HTTP stack, the YAML parser,
+  the requirement parser, the progress display, SQLite, asyncio and the thread pool)
+  are not imported at start-up
+- the median import time of the package itself, i.e. excluding the CLI framework
+  (typer and rich) which every command needs, is within the budget
+
+The budget is relative to the import time of the framework measured in the same
+interpreters, so that it holds on slower or busier machines. Absolute timings vary
+too much between runners to fail on.
+
+Usage:
+    python benchmarks/import_time.py [--runs 11] [--max-ratio 0.5]
+
+Exits with status 1 if a lazy module is imported at start-up or the budget is
+exceeded.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+MODULE = "upgrade_dependencies.main"
+FRAMEWORK_MODULES = ["typer"]
+LAZY_MODULES = [
+    "asyncio",
+    "concurrent.futures",
+    "httpx",
+    "packaging",
+    "rich.progress",
+    "ruamel.yaml",
+    "sqlite3",
+    "tomlkit",
+]
+DEFAULT_RUNS = 11
+DEFAULT_MAX_RATIO = 0.5  # ~0.1 when the budget was set
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    """Import time of a module.
+
+    Attributes:
+        name: Name of the module
+        self_us: Time spent importing the module itself (in microseconds)
+        cumulative_us: Time spent importing the module and its imports (in
+            microseconds)
+    """
+
+    name: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> dict[str, ImportTiming]:
+    """Parses the output of ``python -X importtime``.
+
+    Args:
+        output: Standard error of the interpreter
+
+    Returns:
+        Import time by module name, modules that were already imported are absent
+    """
+    timings: dict[str, ImportTiming] = {}
+
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+
+        if not self_us.strip().isdigit():
+            continue  # header
+
+        timings[name.strip()] = ImportTiming(
+            name=name.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+        )
+
+    return timings
+
+
+def measure(module: str = MODULE) -> dict[str, ImportTiming]:
+    """Imports a module in a fresh interpreter.
+
+    Args:
+        module: Name of the module to import. Defaults to ``MODULE``.
+
+    Returns:
+        Import time by module name
+    """
+    res = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    return parse_importtime(output=res.stderr)
+
+
+def main() -> int:
+    """Runs the benchmark.
+
+    Returns:
+        Exit status, 1 if a lazy module is imported at start-up or the budget is
+        exceeded
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=DEFAULT_MAX_RATIO,
+        help="Maximum import time of the package, as a fraction of that of the "
+        "framework",
+    )
+    args = parser.parse_args()
+
+    measure()  # warm up, i.e. compile the bytecode
+
+    totals: list[float] = []
+    own: list[float] = []
+    ratios: list[float] = []
+    imported: set[str] = set()
+
+    for _ in range(args.runs):
+        timings = measure()
+        total = timings[MODULE].cumulative_us
+        framework = sum(
+            timings[name].cumulative_us for name in FRAMEWORK_MODULES if name in timings
+        )
+        totals.append(total / 1000)
+        own.append((total - framework) / 1000)
+        ratios.append((total - framework) / framework)
+        imported |= {name for name in LAZY_MODULES if name in timings}
+
+    ratio = statistics.median(ratios)
+    framework_names = ", ".join(FRAMEWORK_MODULES)
+    print(f"import {MODULE}: {statistics.median(totals):.1f} ms")
+    print(
+        f"  excluding {framework_names}: {statistics.median(own):.1f} ms, "
+        f"{ratio:.0%} of {framework_names}",
+    )
+    print(f"  budget: {args.max_ratio:.0%} of {framework_names}")
+
+    failed = False
+
+    if len(imported) > 0:
+        print(f"FAIL: imported at start-up: {', '.join(sorted(imported))}")
+        failed = True
+
+    if ratio > args.max_ratio:
+        print(f"FAIL: {ratio:.0%} exceeds the budget of {args.max_ratio:.0%}")
+        failed = True
+
+    if not failed:
+        print("OK")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""Micro-benchmarks of the parsing and rewriting hot paths, checked against baselines.
+
+Times the functions whose cost grows with the size of the project, on a large
+synthetic project (see ``fakes.py``):
+
+- ``extract_variable_from_file``: scanning a workflow file for ``uses``
+- ``parse_pre_commit_config``: parsing the pre-commit config
+- ``parse_requirement``: parsing every requirement of the project
+- ``build_new_requirement``: building the updated requirement of every requirement
+- ``save_pypi_dependencies``: registering the PyPI dependencies of the project
+- ``render_edits``: rewriting pyproject.toml, the workflows and the pre-commit config
+  to update every dependency of the project, as ``update-all`` does
+
+YAML files are parsed from scratch on every call, as in a fresh process. The median
+of every benchmark is compared to ``baselines.json`` and the run fails if any is more
+than ``--tolerance`` slower. Every round also times a fixed pure-Python calibration
+workload, and the baselines record the duration of each benchmark relative to it
+rather than in seconds, so that baselines recorded on one machine can be checked on
+another.
+
+Usage:
+    python benchmarks/micro.py [--rounds 30] [--tolerance 0.3] [--save]
+        [--baselines benchmarks/baselines.json]
+
+Exits with status 1 if a benchmark regressed.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tomllib
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from fakes import NEW_VERSION, make_project
+
+import upgrade_dependencies.utils as utils
+from upgrade_dependencies.project import (
+    Project,
+    build_new_requirement,
+    parse_requirement,
+)
+
+DEFAULT_ROUNDS = 30
+DEFAULT_TOLERANCE = 0.3
+DEFAULT_BASELINES = Path(__file__).parent / "baselines.json"
+N_DEPS = 300
+N_WORKFLOWS = 30
+N_HOOKS = 40
+ACTIONS_PER_WORKFLOW = 40
+CALIBRATION_SIZE = 5_000
+REQUIREMENTS = [
+    "httpx~=0.27.2",
+    "packaging>=24.2,<25",
+    "ruamel-yaml==0.18.6",
+    "uvicorn[standard]~=0.32.0",
+    "requests[socks,security]>=2.31",
+    'tomli>=2.0.1; python_version < "3.11"',
+    'pywin32==308; sys_platform == "win32"',
+    "numpy>=1.26,!=2.0.0",
+    "Django~=5.1",
+    "typing_extensions>=4.12",
+]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """Function to time.
+
+    Attributes:
+        name: Name of the benchmark
+        func: Function to time
+        setup: Function called before every round, not timed
+        number: Number of calls of ``func`` in every round, more than one for fast
+            functions to reduce the timer noise
+    """
+
+    name: str
+    func: Callable[[], object]
+    setup: Callable[[], None]
+    number: int = 1
+
+
+@dataclass(frozen=True)
+class Timing:
+    """Timing of a benchmark.
+
+    Attributes:
+        median: Median duration of a call (in seconds)
+        calibrated: Median duration of a call relative to the calibration workload
+            timed in the same round
+    """
+
+    median: float
+    calibrated: float
+
+
+def time_call(benchmark: Benchmark) -> float:
+    """Times one round of a benchmark.
+
+    Args:
+        benchmark: Benchmark
+
+    Returns:
+        Duration of a call (in seconds)
+    """
+    benchmark.setup()
+    start = time.perf_counter()
+
+    for _ in range(benchmark.number):
+        benchmark.func()
+
+    return (time.perf_counter() - start) / benchmark.number
+
+
+def time_benchmark(
+    benchmark: Benchmark,
+    calibration: Benchmark,
+    rounds: int,
+) -> Timing:
+    """Times a benchmark, interleaved with the calibration workload.
+
+    Timing the calibration in every round, rather than once per run, follows changes
+    of the speed of the machine during the run (e.g. frequency scaling or other load).
+
+    Args:
+        benchmark: Benchmark
+        calibration: Calibration workload
+        rounds: Number of timed rounds
+
+    Returns:
+        Timing of the benchmark
+    """
+    durations: list[float] = []
+    calibrated: list[float] = []
+
+    for _ in range(rounds):
+        reference = time_call(benchmark=calibration)
+        duration = time_call(benchmark=benchmark)
+        durations.append(duration)
+        calibrated.append(duration / reference)
+
+    return Timing(
+        median=statistics.median(durations),
+        calibrated=statistics.median(calibrated),
+    )
+
+
+def create_calibration() -> Benchmark:
+    """Creates the calibration workload, measuring the speed of the machine.
+
+    Exercises the same kind of work as the benchmarks (string handling, dicts and
+    sorting) without depending on the code being benchmarked.
+
+    Returns:
+        Calibration benchmark
+    """
+    words = [f"package-{idx}~={idx % 7}.{idx % 13}" for idx in range(CALIBRATION_SIZE)]
+
+    def workload() -> None:
+        counts: dict[str, int] = {}
+
+        for word in sorted(words, reverse=True):
+            name, version = word.split("~=")
+            counts[name[:9]] = counts.get(name[:9], 0) + len(version)
+
+    return Benchmark(name="calibration", func=workload, setup=lambda: None)
+
+
+def create_benchmarks(path: Path) -> list[Benchmark]:
+    """Creates the benchmarks on the synthetic project.
+
+    Args:
+        path: Directory of the synthetic project
+
+    Returns:
+        Benchmarks
+    """
+    workflow_path = path / ".github" / "workflows" / "workflow-0.yml"
+    pre_commit_path = path / ".pre-commit-config.yaml"
+
+    with (path / "pyproject.toml").open("rb") as f:
+        ppt = tomllib.load(f)
+
+    requirements = [REQUIREMENTS[idx % len(REQUIREMENTS)] for idx in range(N_DEPS)]
+    parsed = [parse_requirement(requirement=req) for req in requirements]
+    projects: list[Project] = []
+
+    # the edits that update every dependency, planned once
+    project = Project(project_path=str(path))
+    edits = project.plan_updates(
+        updates=[(dep, NEW_VERSION) for dep in project.dependencies],
+    )
+
+    def cold() -> None:
+        utils.yml_cache.clear()
+
+    def new_project() -> None:
+        projects[:] = [Project(project_path=str(path))]
+        cold()
+
+    def save_pypi_dependencies() -> None:
+        projects[0].save_pypi_dependencies(
+            ppt=ppt,
+            workflows_dir=workflow_path.parent,
+        )
+
+    def render_edits() -> None:
+        for file_path, file_edits in edits.items():
+            utils.render_edits(file_path=file_path, edits=file_edits)
+
+    return [
+        Benchmark(
+            name="extract_variable_from_file",
+            func=lambda: utils.extract_variable_from_file(
+                file_path=str(workflow_path),
+                variable_name="uses",
+            ),
+            setup=cold,
+        ),
+        Benchmark(
+            name="parse_pre_commit_config",
+            func=lambda: utils.parse_pre_commit_config(file_path=pre_commit_path),
+            setup=cold,
+        ),
+        Benchmark(
+            name="parse_requirement",
+            func=lambda: [parse_requirement(requirement=req) for req in requirements],
+            setup=lambda: None,
+        ),
+        Benchmark(
+            name="build_new_requirement",
+            func=lambda: [
+                build_new_requirement(old_requirement=req, new_version="2.0.0")
+                for req in parsed
+            ],
+            setup=lambda: None,
+            number=10,
+        ),
+        Benchmark(
+            name="save_pypi_dependencies",
+            func=save_pypi_dependencies,
+            setup=new_project,
+        ),
+        Benchmark(
+            name="render_edits",
+            func=render_edits,
+            setup=lambda: None,
+        ),
+    ]
+
+
+def main() -> int:
+    """Runs the benchmarks.
+
+    Returns:
+        Exit status, 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--baselines", type=Path, default=DEFAULT_BASELINES)
+    parser.add_argument("--save", action="store_true", help="Record the baselines")
+    args = parser.parse_args()
+
+    baselines: dict[str, float] = {}
+
+    if not args.save and args.baselines.exists():
+        baselines = json.loads(args.baselines.read_text())["benchmarks"]
+
+    calibration = create_calibration()
+    calibration.func()  # warm up
+    results: dict[str, float] = {}
+    regressed: list[str] = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir)
+        make_project(
+            path=path,
+            n_deps=N_DEPS,
+            n_workflows=N_WORKFLOWS,
+            n_hooks=N_HOOKS,
+            actions_per_workflow=ACTIONS_PER_WORKFLOW,
+        )
+
+        for benchmark in create_benchmarks(path=path):
+            benchmark.setup()
+            benchmark.func()  # warm up
+            timing = time_benchmark(
+                benchmark=benchmark,
+                calibration=calibration,
+                rounds=args.rounds,
+            )
+            results[benchmark.name] = timing.calibrated
+            line = (
+                f"{benchmark.name:>32}: {timing.median * 1000:8.3f} ms, "
+                f"{timing.calibrated:8.4f} x calibration"
+            )
+
+            if (baseline := baselines.get(benchmark.name)) is not None:
+                change = timing.calibrated / baseline - 1
+                line += f" ({change:+.0%} vs {baseline:.4f})"
+
+                if change > args.tolerance:
+                    regressed.append(benchmark.name)
+                    line += " REGRESSED"
+
+            print(line)
+
+    if args.save:
+        baselines_data = {
+            "machine": f"{platform.machine()} {platform.python_implementation()} "
+            f"{platform.python_version()}",
+            "benchmarks": results,
+        }
+        args.baselines.write_text(json.dumps(baselines_data, indent=2) + "\n")
+        print(f"Saved baselines to {args.baselines}")
+        return 0
+
+    if len(baselines) == 0:
+        print(f"No baselines in {args.baselines}, record them with --save")
+        return 0
+
+    if len(regressed) > 0:
+        print(f"FAIL: slower than the baseline by more than {args.tolerance:.0%}")
+        return 1
+
+    print("OK")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Persistent on-disk cache for dependency data responses."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_TTL = 600.0  # seconds
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # bytes
+
+
+def default_cache_dir() -> Path:
+    """Gets the default cache directory, honouring ``XDG_CACHE_HOME``.
+
+    Returns:
+        Cache directory
+    """
+    cache_home = os.getenv("XDG_CACHE_HOME")
+    base = Path(cache_home) if cache_home else Path.home() / ".cache"
+
+    return base / "upgrade-dependencies"
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body with its validators.
+
+    Attributes:
+        url: URL the response was fetched from
+        data: Decoded JSON body
+        etag: Value of the ``ETag`` response header
+        last_modified: Value of the ``Last-Modified`` response header
+        stored_at: Unix time the response was last fetched or revalidated
+    """
+
+    url: str
+    data: Any
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+    def revalidation_headers(self) -> dict[str, str]:
+        """Builds the conditional request headers for this entry.
+
+        Returns:
+            ``If-None-Match`` and/or ``If-Modified-Since`` headers
+        """
+        headers: dict[str, str] = {}
+
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """Stores JSON responses on disk with TTL and size-based (LRU) eviction.
+
+    Entries younger than ``ttl`` are served without a request. Older entries are
+    revalidated with ``If-None-Match``/``If-Modified-Since``, so an unchanged resource
+    costs a 304 rather than a full download. The cache is best effort, any I/O error is
+    treated as a cache miss.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        """Inits the ResponseCache class.
+
+        Args:
+            cache_dir: Directory to store the cached responses in
+            ttl: Time (in seconds) an entry is used without revalidation. Defaults to
+                ``DEFAULT_TTL``.
+            max_size: Maximum total size (in bytes) of the cache, least recently used
+                entries are evicted beyond this. Defaults to ``DEFAULT_MAX_SIZE``.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+
+        with contextlib.suppress(OSError):
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, url: str) -> Path:
+        """Gets the file path of the cache entry for a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Path to the cache entry
+        """
+        import hashlib  # only needed once data is fetched
+
+        digest = hashlib.sha256(url.encode()).hexdigest()
+
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, url: str) -> CacheEntry | None:
+        """Gets the cache entry for a URL.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Cache entry, None if there is no (valid) entry
+        """
+        path = self.path_for(url=url)
+
+        try:
+            with path.open("r") as f:
+                entry = CacheEntry(**json.load(f))
+
+            os.utime(path)  # mark as recently used
+        except (OSError, TypeError, ValueError):
+            return None
+
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Checks whether an entry can be used without revalidation.
+
+        Args:
+            entry: Cache entry
+
+        Returns:
+            Whether the entry is younger than the TTL
+        """
+        return time.time() - entry.stored_at < self.ttl
+
+    def set(
+        self,
+        url: str,
+        data: Any,
+        headers: httpx.Headers,
+    ) -> None:
+        """Stores a response in the cache.
+
+        Responses without an ``ETag`` or ``Last-Modified`` header are still stored and
+        served while fresh, but are fully re-downloaded once stale. Call ``evict()``
+        once a batch of responses has been stored to enforce ``max_size``.
+
+        Args:
+            url: Request URL
+            data: Decoded JSON body
+            headers: Response headers
+        """
+        entry = CacheEntry(
+            url=url,
+            data=data,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            stored_at=time.time(),
+        )
+        self.write(entry=entry)
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """Marks an entry as fresh after a successful (304) revalidation.
+
+        Args:
+            entry: Cache entry
+        """
+        entry.stored_at = time.time()
+        self.write(entry=entry)
+
+    def write(self, entry: CacheEntry) -> None:
+        """Atomically writes an entry to disk.
+
+        Args:
+            entry: Cache entry
+        """
+        path = self.path_for(url=entry.url)
+
+        with contextlib.suppress(OSError):
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".temp")
+
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(asdict(entry), f, separators=(",", ":"))
+
+                os.replace(temp_path, path)
+            except (OSError, TypeError, ValueError):
+                Path(temp_path).unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until under ``max_size``."""
+        try:
+            files = [(p, p.stat()) for p in self.cache_dir.glob("*.json")]
+        except OSError:
+            return
+
+        total_size = sum(st.st_size for _, st in files)
+
+        for path, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total_size <= self.max_size:
+                break
+
+            with contextlib.suppress(OSError):
+                path.unlink()
+                total_size -= st.st_size
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        for path in self.cache_dir.glob("*.json"):
+            with contextlib.suppress(OSError):
+                path.unlink()
@@ -0,0 +1,251 @@
+"""Pooled HTTP clients used to fetch dependency data."""
+
+import asyncio
+import codecs
+import json
+import re
+from collections.abc import Awaitable, Callable, Hashable
+from importlib.util import find_spec
+from typing import Any
+
+import httpx
+
+from upgrade_dependencies.ratelimit import RateLimiter, RateLimitTransport
+from upgrade_dependencies.retry import CircuitBreaker, RetryPolicy, RetryTransport
+
+PYPI_URL = "https://pypi.org"
+GITHUB_API_URL = "https://api.github.com"
+
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+DEFAULT_TIMEOUT = 10.0  # seconds
+DEFAULT_RETRY = RetryPolicy()
+VALUE_TOKEN = re.compile(r'["{}\[\]]')
+STRING_TOKEN = re.compile(r'["\\]')
+
+
+def http2_available() -> bool:
+    """Checks whether the HTTP/2 dependency (``h2``) is installed.
+
+    ``h2`` is installed with the ``httpx[http2]`` requirement, this only guards against
+    environments where it was left out.
+
+    Returns:
+        Whether HTTP/2 can be negotiated
+    """
+    return find_spec("h2") is not None
+
+
+def create_client(
+    base_url: str,
+    limits: httpx.Limits = DEFAULT_LIMITS,
+    http2: bool = True,
+    headers: dict[str, str] | None = None,
+    rate_limiter: RateLimiter | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    retry: RetryPolicy | None = DEFAULT_RETRY,
+) -> httpx.AsyncClient:
+    """Creates a long-lived, pooled async client for a single host.
+
+    Connections are kept alive between requests so that every dependency fetched from
+    the same host shares the TCP/TLS setup. HTTP/2 is used if requested and ``h2`` is
+    installed, otherwise the client falls back to HTTP/1.1.
+
+    Args:
+        base_url: Base URL of the host, e.g. ``https://pypi.org``
+        limits: Connection pool limits. Defaults to ``DEFAULT_LIMITS``.
+        http2: Whether to negotiate HTTP/2 if possible. Defaults to True.
+        headers: Default headers sent with every request. Defaults to None.
+        rate_limiter: If provided, requests are scheduled through the rate limiter.
+            Defaults to None.
+        timeout: Timeout (in seconds) of each request attempt. Defaults to
+            ``DEFAULT_TIMEOUT``.
+        retry: Retry policy for transient failures, requests to the host also share a
+            circuit breaker. If None, failed requests are not retried. Defaults to
+            ``DEFAULT_RETRY``.
+
+    Returns:
+        Async HTTP client
+    """
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+        limits=limits,
+        http2=http2 and http2_available(),
+    )
+
+    if rate_limiter is not None:
+        transport = RateLimitTransport(transport=transport, limiter=rate_limiter)
+
+    if retry is not None:
+        transport = RetryTransport(
+            transport=transport,
+            policy=retry,
+            breaker=CircuitBreaker(),
+        )
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=timeout,
+        transport=transport,
+    )
+
+
+class JsonValueScanner:
+    """Finds the end of a JSON object or array while its text is still arriving.
+
+    Tracks the nesting depth and whether the scan is inside a string, so each
+    character is only looked at once however the text is split into chunks.
+    """
+
+    def __init__(
+        self,
+        start: int,
+    ) -> None:
+        """Inits the JsonValueScanner class.
+
+        Args:
+            start: Index of the opening bracket of the value
+        """
+        self.pos: int = start
+        self.depth = 0
+        self.in_string = False
+
+    def find_end(
+        self,
+        text: str,
+    ) -> int | None:
+        """Scans the text received since the previous call.
+
+        Args:
+            text: Text received so far, the previous text with more appended
+
+        Returns:
+            Index just after the closing bracket of the value, None if the value is
+            not complete yet
+        """
+        while True:
+            token = STRING_TOKEN if self.in_string else VALUE_TOKEN
+            match = token.search(text, self.pos)
+
+            if match is None:
+                # past the end if an escaped character is still to come
+                self.pos = max(self.pos, len(text))
+                return None
+
+            char = match.group()
+            self.pos = match.end()
+
+            if char == "\\":
+                self.pos += 1  # skip the escaped character
+            elif char == '"':
+                self.in_string = not self.in_string
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+
+                if self.depth == 0:
+                    return self.pos
+
+
+async def read_json_member(
+    response: httpx.Response,
+    key: str,
+) -> Any:
+    """Reads a single top-level member from a streamed JSON object response.
+
+    If ``key`` is the first member of the document, only the bytes up to the end of its
+    value are downloaded and the rest of the response is discarded when the stream is
+    closed. Otherwise the whole document is read and the member is taken from it. The
+    member value must be an object or an array. The end of the value is found with a
+    ``JsonValueScanner`` as the chunks arrive, and the value is decoded once.
+
+    Args:
+        response: Streamed response, i.e. from ``client.stream()``
+        key: Name of the top-level member to read
+
+    Returns:
+        Decoded value of the member
+
+    Raises:
+        KeyError: If the document does not contain ``key``
+    """
+    prefix = re.compile(rf'\s*\{{\s*"{re.escape(key)}"\s*:\s*(?=[\[{{])')
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    text = ""
+    start: int | None = None
+    scanner: JsonValueScanner | None = None
+    scan = True
+
+    async for chunk in response.aiter_bytes():
+        piece = utf8_decoder.decode(chunk)
+        text += piece
+
+        if not scan:
+            continue
+
+        if start is None or scanner is None:
+            match = prefix.match(text)
+
+            if match is not None:
+                start = match.end()
+                scanner = JsonValueScanner(start=start)
+            elif len(text) >= len(key) + 64:
+                scan = False  # not the first member, read the whole document
+                continue
+            else:
+                continue
+
+        end = scanner.find_end(text=text)
+
+        if end is None:
+            continue  # value not complete yet
+
+        return json.loads(text[start:end])
+
+    text += utf8_decoder.decode(b"", final=True)
+
+    return json.loads(text)[key]
+
+
+class SingleFlight[T]:
+    """Coalesces concurrent calls with the same key into a single call.
+
+    While a call for a key is in flight, further calls for that key wait for and share
+    its result (or exception) instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        """Inits the SingleFlight class."""
+        self.calls: dict[Hashable, asyncio.Task[T]] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Calls ``fn``, unless a call with the same key is already in flight.
+
+        Args:
+            key: Key identifying the call
+            fn: Coroutine function to call
+
+        Returns:
+            Result of the (shared) call
+        """
+        task = self.calls.get(key)
+
+        if task is None:
+
+            async def call() -> T:
+                return await fn()
+
+            task = asyncio.ensure_future(call())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+
+        # shield so that one caller being cancelled does not cancel the shared call
+        return await asyncio.shield(task)
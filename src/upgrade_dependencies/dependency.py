@@ -1,17 +1,83 @@
 """Class for a python project dependency."""
 
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, replace
 from datetime import UTC, datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+import upgrade_dependencies.tracing as tracing
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    import httpx
+    from packaging.specifiers import SpecifierSet
+    from packaging.version import Version
+
+    from upgrade_dependencies.cache import ResponseCache
+
+
+@dataclass(slots=True, frozen=True)
+class ReleaseInfo:
+    """Facts extracted about the latest release of a dependency.
+
+    Attributes:
+        version: Latest version (or tag)
+        released: Time the latest version was released, None if unknown
+        yanked: Whether the latest version has been yanked
+        etag: ``ETag`` of the response the facts were extracted from
+    """
+
+    version: str
+    released: datetime | None = None
+    yanked: bool = False
+    etag: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Converts the release facts to a JSON serialisable dictionary.
 
-import httpx
-from packaging.specifiers import SpecifierSet
-from packaging.utils import canonicalize_name
-from packaging.version import Version
+        Returns:
+            Release facts (excluding the ETag)
+        """
+        return {
+            "version": self.version,
+            "released": None if self.released is None else self.released.isoformat(),
+            "yanked": self.yanked,
+        }
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: dict[str, Any],
+        etag: str | None = None,
+    ) -> ReleaseInfo:
+        """Creates release facts from a dictionary created by ``to_dict()``.
+
+        Args:
+            data: Release facts
+            etag: ``ETag`` of the response the facts were extracted from. Defaults to
+                None.
+
+        Returns:
+            Release facts
+        """
+        released = data.get("released")
+
+        return cls(
+            version=data["version"],
+            released=None if released is None else datetime.fromisoformat(released),
+            yanked=data.get("yanked", False),
+            etag=etag,
+        )
 
 
 class Dependency:
     """_summary_."""
 
+    __slots__ = ("package_name", "release", "specifier")
+
     def __init__(
         self,
         package_name: str,
@@ -23,9 +89,9 @@ class Dependency:
             package_name: _description_
             specifier: _description_
         """
-        self.package_name = package_name
+        self.package_name = sys.intern(package_name)
         self.specifier = specifier
-        self.data: dict[str, Any] | None = None
+        self.release: ReleaseInfo | None = None
 
     def get_latest_version(self) -> Version:
         """Gets the latest version of the dependency from PyPI.
@@ -41,6 +107,8 @@ class Dependency:
         Returns:
             _description_
         """
+        from packaging.version import Version
+
         latest = self.get_latest_version()
 
         for spec in sorted(self.specifier, key=str):
@@ -61,20 +129,149 @@ class Dependency:
 
         return not is_latest_ok
 
-    def get_data(self) -> dict[str, Any]:
-        """_summary_.
+    def get_release(self) -> ReleaseInfo:
+        """Gets the facts about the latest release of the dependency.
 
         Returns:
-            _description_
+            Latest release facts
         """
-        if self.data is None:
+        if self.release is None:
             msg = "Call Dependency.save_data() first!"
             raise RuntimeError(msg)
 
-        return self.data
+        return self.release
+
+    async def save_data(
+        self,
+        client: httpx.AsyncClient | None = None,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        """_summary_.
+
+        Args:
+            client: Pooled client to fetch the data with, if None a new client is
+                created for this request. Defaults to None.
+            cache: Response cache, if None every request is made in full. Defaults to
+                None.
+        """
+        raise NotImplementedError
+
+    async def fetch_release(
+        self,
+        client: httpx.AsyncClient,
+        cache: ResponseCache | None = None,
+    ) -> ReleaseInfo:
+        """Fetches and returns the latest release facts of the dependency.
+
+        Args:
+            client: Pooled client to fetch the data with
+            cache: Response cache. Defaults to None.
+
+        Returns:
+            Latest release facts
+        """
+        await self.save_data(client=client, cache=cache)
+
+        return self.get_release()
+
+    async def fetch_data(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        cache: ResponseCache | None = None,
+        cache_key: str | None = None,
+        read: Callable[[httpx.Response], Awaitable[ReleaseInfo]] | None = None,
+    ) -> None:
+        """Fetches the JSON data at ``url`` and saves the latest release facts.
+
+        Fresh cache entries are used without a request, stale entries are revalidated
+        with a conditional request and reused if the server responds with a 304. The
+        response is streamed and only the extracted facts are kept, the decoded
+        response is discarded.
+
+        Args:
+            client: Client to fetch the data with
+            url: URL relative to the client's base URL
+            cache: Response cache. Defaults to None.
+            cache_key: Key to cache the data under, if None the full URL is used.
+                Defaults to None.
+            read: Coroutine function that extracts the release facts from the streamed
+                response, if None ``read_response()`` is used. Defaults to None.
+        """
+        key = str(client.base_url.join(url)) if cache_key is None else cache_key
+        entry = None if cache is None else cache.get(url=key)
+        headers = {} if entry is None else entry.revalidation_headers()
+
+        if cache is not None and entry is not None and cache.is_fresh(entry=entry):
+            self.release = ReleaseInfo.from_dict(data=entry.data, etag=entry.etag)
+            return
+
+        async with client.stream(method="GET", url=url, headers=headers) as response:
+            if cache is not None and entry is not None and response.status_code == 304:
+                cache.refresh(entry=entry)
+                self.release = ReleaseInfo.from_dict(data=entry.data, etag=entry.etag)
+                return
+
+            read = self.read_response if read is None else read
+            release = await read(response)
+
+        self.release = replace(release, etag=response.headers.get("etag"))
+
+        if cache is not None:
+            cache.set(url=key, data=release.to_dict(), headers=response.headers)
+
+    async def read_response(
+        self,
+        response: httpx.Response,
+    ) -> ReleaseInfo:
+        """Reads a streamed response and extracts the latest release facts.
+
+        Args:
+            response: Streamed response
+
+        Returns:
+            Latest release facts
+        """
+        await response.aread()
+        self.handle_response(response=response)
+
+        return self.parse_data(data=response.json())
+
+    def handle_response(
+        self,
+        response: httpx.Response,
+    ) -> None:
+        """Raises an error if the request failed.
+
+        Args:
+            response: Response
+        """
+        response.raise_for_status()  # raise an error if the request failed
+
+    def parse_data(
+        self,
+        data: dict[str, Any],
+    ) -> ReleaseInfo:
+        """Extracts the latest release facts from a decoded response.
+
+        Args:
+            data: Decoded JSON response
+
+        Returns:
+            Latest release facts
+        """
+        raise NotImplementedError
+
+    @property
+    def flight_key(self) -> str:
+        """Key identifying the remote resource of the dependency.
+
+        Dependencies with the same key share a single request when fetched
+        concurrently.
 
-    async def save_data(self) -> None:
-        """_summary_."""
+        Returns:
+            Resource key
+        """
         raise NotImplementedError
 
     @property
@@ -112,6 +309,8 @@ class Dependency:
 class PyPIDependency(Dependency):
     """Class for a dependency from the PyPI."""
 
+    __slots__ = ("base", "extra", "extras", "group")
+
     def __init__(
         self,
         package_name: str,
@@ -131,6 +330,8 @@ class PyPIDependency(Dependency):
             extra: _description_. Defaults to None.
             group: _description_. Defaults to None.
         """
+        from packaging.utils import canonicalize_name
+
         super().__init__(
             package_name=canonicalize_name(package_name),
             specifier=specifier,
@@ -146,16 +347,111 @@ class PyPIDependency(Dependency):
         Returns:
             Latest dependency version
         """
-        return Version(version=self.get_data()["info"]["version"])
+        from packaging.version import Version
+
+        return Version(version=self.get_release().version)
+
+    async def save_data(
+        self,
+        client: httpx.AsyncClient | None = None,
+        cache: ResponseCache | None = None,
+        slim: bool = True,
+    ) -> None:
+        """_summary_.
+
+        In slim mode only the ``info`` member of the PyPI JSON document is downloaded
+        and kept, the (potentially very large) release and file listings are never
+        read.
+
+        Args:
+            client: Pooled PyPI client to fetch the data with, if None a new client is
+                created for this request. Defaults to None.
+            cache: Response cache. Defaults to None.
+            slim: Whether to only fetch the fields required by this tool. Defaults to
+                True.
+        """
+        if client is None:
+            # the HTTP stack is only imported when data is fetched
+            from upgrade_dependencies.client import PYPI_URL, create_client
+
+            async with create_client(base_url=PYPI_URL) as own_client:
+                await self.save_data(client=own_client, cache=cache, slim=slim)
+
+            return
+
+        url = f"/pypi/{self.package_name}/json"
+        key = str(client.base_url.join(url))
+
+        with tracing.span(
+            "save_data",
+            category="http",
+            asynchronous=True,
+            package=self.package_name,
+        ):
+            await self.fetch_data(
+                client=client,
+                url=url,
+                cache=cache,
+                cache_key=f"{key}#info" if slim else key,
+                read=self.read_info if slim else None,
+            )
+
+    async def read_info(
+        self,
+        response: httpx.Response,
+    ) -> ReleaseInfo:
+        """Reads only the ``info`` member of a streamed PyPI JSON response.
+
+        The release time is not part of ``info`` and is therefore unknown in slim mode.
 
-    async def save_data(self) -> None:
-        """_summary_."""
-        url = "/".join(["https://pypi.org", "pypi", self.package_name, "json"])
+        Args:
+            response: Streamed response
+
+        Returns:
+            Latest release facts
+        """
+        if response.is_error:
+            await response.aread()
+            self.handle_response(response=response)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url=url)
-            response.raise_for_status()  # raise an error if the request failed
-            self.data = response.json()
+        from upgrade_dependencies.client import read_json_member
+
+        info = await read_json_member(response=response, key="info")
+
+        return ReleaseInfo(version=info["version"], yanked=bool(info.get("yanked")))
+
+    def parse_data(
+        self,
+        data: dict[str, Any],
+    ) -> ReleaseInfo:
+        """Extracts the latest release facts from a full PyPI JSON document.
+
+        Args:
+            data: Decoded PyPI JSON document
+
+        Returns:
+            Latest release facts
+        """
+        upload_times = [
+            datetime.fromisoformat(url["upload_time_iso_8601"])
+            for url in data.get("urls", [])
+            if url.get("upload_time_iso_8601")
+        ]
+
+        return ReleaseInfo(
+            version=data["info"]["version"],
+            released=min(upload_times, default=None),
+            yanked=bool(data["info"].get("yanked")),
+        )
+
+    @property
+    def flight_key(self) -> str:
+        """Key identifying the PyPI project of the dependency.
+
+        Returns:
+            Resource key
+        """
+        return f"pypi:{self.package_name}"
 
     @property
     def loc(self) -> str:
@@ -195,6 +491,8 @@ class PyPIDependency(Dependency):
 class GitHubDependency(Dependency):
     """_summary_."""
 
+    __slots__ = ("action", "full_version", "has_v", "owner", "pre_commit", "repo")
+
     def __init__(
         self,
         package_name: str,
@@ -222,8 +520,8 @@ class GitHubDependency(Dependency):
         if "/" in repo:
             repo = repo.split("/")[0]
 
-        self.owner = owner
-        self.repo = repo
+        self.owner = sys.intern(owner)
+        self.repo = sys.intern(repo)
         self.action = action
         self.pre_commit = pre_commit
         self.full_version = full_version
@@ -235,27 +533,45 @@ class GitHubDependency(Dependency):
         Returns:
             Latest dependency version
         """
-        return Version(version=self.get_data().get("tag_name", ""))
+        from packaging.version import Version
+
+        return Version(version=self.get_release().version)
 
     async def save_data(
         self,
+        client: httpx.AsyncClient | None = None,
+        cache: ResponseCache | None = None,
         gh_pat: str | None = None,
     ) -> None:
         """_summary_.
 
         Args:
-            gh_pat: _description_
+            client: Pooled GitHub API client to fetch the data with, if None a new
+                client is created for this request. Defaults to None.
+            cache: Response cache. Defaults to None.
+            gh_pat: GitHub personal access token, only used if ``client`` is None.
+                Defaults to None.
         """
-        url = f"https://api.github.com/repos/{self.owner}/{self.repo}/releases/latest"
-
-        async with httpx.AsyncClient() as client:
-            if gh_pat is None:
-                response = await client.get(url=url)
-            else:
-                headers = {"Authorization": f"Bearer {gh_pat}"}
-                response = await client.get(url=url, headers=headers)
-
-            self.handle_response(response=response)
+        if client is None:
+            from upgrade_dependencies.client import GITHUB_API_URL, create_client
+            from upgrade_dependencies.ratelimit import RateLimiter
+
+            async with create_client(
+                base_url=GITHUB_API_URL,
+                headers=github_headers(gh_pat=gh_pat),
+                rate_limiter=RateLimiter(),
+            ) as own_client:
+                await self.save_data(client=own_client, cache=cache)
+
+            return
+
+        with tracing.span(
+            "save_data",
+            category="http",
+            asynchronous=True,
+            package=self.package_name,
+        ):
+            await self.fetch_data(client=client, url=self.release_url, cache=cache)
 
     def handle_response(
         self,
@@ -266,22 +582,55 @@ class GitHubDependency(Dependency):
         Args:
             response: _description_
         """
-        if response.status_code == 200:
-            self.data = response.json()
-        elif response.status_code in [401, 403, 404, 429]:
-            reset_time = datetime.fromtimestamp(
-                int(response.headers.get("x-ratelimit-reset")),
-                UTC,
-            )
+        if response.status_code in [401, 403, 404, 429]:
             msg = f"{response.status_code} - {response.reason_phrase}."
+            reset = response.headers.get("x-ratelimit-reset")
 
-            if response.reason_phrase == "rate limit exceeded":
+            if response.headers.get("x-ratelimit-remaining") == "0" and reset:
+                reset_time = datetime.fromtimestamp(int(reset), UTC)
                 msg += f" Rate limit reset at {reset_time}."
             raise RuntimeError(msg)
-        else:
+        elif response.status_code != 200:
             msg = "Github API Error."
             raise RuntimeError(msg)
 
+    def parse_data(
+        self,
+        data: dict[str, Any],
+    ) -> ReleaseInfo:
+        """Extracts the latest release facts from a GitHub release.
+
+        Args:
+            data: Decoded GitHub release
+
+        Returns:
+            Latest release facts
+        """
+        published_at = data.get("published_at")
+        released = (
+            None if published_at is None else datetime.fromisoformat(published_at)
+        )
+
+        return ReleaseInfo(version=data.get("tag_name", ""), released=released)
+
+    @property
+    def flight_key(self) -> str:
+        """Key identifying the GitHub repository of the dependency.
+
+        Returns:
+            Resource key
+        """
+        return f"github:{self.owner}/{self.repo}"
+
+    @property
+    def release_url(self) -> str:
+        """URL of the latest release, relative to the GitHub API.
+
+        Returns:
+            Latest release URL
+        """
+        return f"/repos/{self.owner}/{self.repo}/releases/latest"
+
     @property
     def loc(self) -> str:
         """_summary_.
@@ -299,3 +648,18 @@ class GitHubDependency(Dependency):
             _description_
         """
         return self.repo
+
+
+def github_headers(gh_pat: str | None) -> dict[str, str]:
+    """Builds the default headers for GitHub API requests.
+
+    Args:
+        gh_pat: GitHub personal access token
+
+    Returns:
+        Request headers
+    """
+    if gh_pat is None:
+        return {}
+
+    return {"Authorization": f"Bearer {gh_pat}"}
@@ -0,0 +1,274 @@
+"""Checkout-free git commits built with plumbing commands."""
+
+import tempfile
+from pathlib import Path
+
+import upgrade_dependencies.utils as utils
+
+DEFAULT_FILE_MODE = "100644"
+
+
+def get_repo_root(cwd: Path | None = None) -> Path:
+    """Gets the root of the git working tree.
+
+    Args:
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        Path to the root of the working tree
+    """
+    res = utils.run_shell_command(["git", "rev-parse", "--show-toplevel"], cwd=cwd)
+
+    return Path(res.stdout.strip())
+
+
+def get_remote_url(
+    remote: str = "origin",
+    cwd: Path | None = None,
+) -> str | None:
+    """Gets the URL of a git remote.
+
+    Args:
+        remote: Name of the remote. Defaults to "origin".
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        URL of the remote, None if the remote does not exist
+    """
+    try:
+        res = utils.run_shell_command(["git", "remote", "get-url", remote], cwd=cwd)
+    except RuntimeError:
+        return None
+
+    return res.stdout.strip()
+
+
+def resolve_commit(
+    ref: str,
+    cwd: Path | None = None,
+) -> str:
+    """Gets the commit a ref points to.
+
+    Args:
+        ref: Branch name, tag or commit
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        Commit hash
+    """
+    res = utils.run_shell_command(
+        ["git", "rev-parse", "--verify", "--end-of-options", f"{ref}^{{commit}}"],
+        cwd=cwd,
+    )
+
+    return res.stdout.strip()
+
+
+def get_repo_path(
+    file_path: Path,
+    root: Path,
+) -> str:
+    """Gets the path of a file as stored in git.
+
+    Args:
+        file_path: Path to the file
+        root: Root of the working tree
+
+    Returns:
+        Path relative to the root, with forward slashes
+    """
+    return file_path.resolve().relative_to(root.resolve()).as_posix()
+
+
+def read_file(
+    ref: str,
+    file_path: Path,
+    cwd: Path | None = None,
+) -> str | None:
+    """Reads the contents of a file at a commit, ignoring the working tree.
+
+    Args:
+        ref: Branch name, tag or commit
+        file_path: Path to the file in the working tree
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        Contents of the file, None if the file does not exist at the commit
+    """
+    path = get_repo_path(file_path=file_path, root=get_repo_root(cwd=cwd))
+
+    try:
+        res = utils.run_shell_command(
+            ["git", "cat-file", "blob", f"{ref}:{path}"],
+            cwd=cwd,
+            binary=True,
+        )
+    except RuntimeError:
+        return None
+
+    # decoded from bytes, so the line endings are kept as committed
+    return res.stdout.decode()
+
+
+def export_files(
+    ref: str,
+    paths: list[Path],
+    base: Path,
+    dest: Path,
+    cwd: Path | None = None,
+) -> list[Path]:
+    """Writes the files under some paths at a commit to another directory.
+
+    Args:
+        ref: Branch name, tag or commit
+        paths: Paths to files or directories in the working tree, missing ones are
+            skipped
+        base: Directory in the working tree, the files keep their path relative to
+            it in ``dest``
+        dest: Directory the files are written to
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        Paths of the written files
+    """
+    root = get_repo_root(cwd=cwd)
+    repo_base = get_repo_path(file_path=base, root=root)
+    res = utils.run_shell_command(
+        [
+            "git",
+            "ls-tree",
+            "-r",
+            "-z",
+            ref,
+            "--",
+            *[get_repo_path(file_path=path, root=root) for path in paths],
+        ],
+        cwd=root,
+    )
+    written: list[Path] = []
+
+    for entry in res.stdout.split("\0"):
+        if len(entry) == 0:
+            continue
+
+        info, file_path = entry.split("\t", maxsplit=1)
+        _, kind, blob = info.split()
+
+        if kind != "blob":
+            continue  # e.g. submodules
+
+        # copied as bytes, so the line endings are kept as committed
+        content = utils.run_shell_command(
+            ["git", "cat-file", "blob", blob],
+            cwd=root,
+            binary=True,
+        )
+        dest_path = dest / Path(file_path).relative_to(repo_base)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        dest_path.write_bytes(content.stdout)
+        written.append(dest_path)
+
+    return written
+
+
+def commit_files(
+    files: dict[Path, str],
+    message: str,
+    branch_name: str,
+    parent: str,
+    cwd: Path | None = None,
+) -> str:
+    """Commits new file contents to a new branch without touching the working tree.
+
+    The blobs are written with ``hash-object``, staged on top of the parent's tree in
+    a temporary index (``GIT_INDEX_FILE``) with a single ``update-index`` and turned
+    into a commit with ``write-tree`` and ``commit-tree``. The branch is then created
+    with ``update-ref``. The working tree, the real index and ``HEAD`` are unchanged.
+    No files are checked out, but ``read-tree`` loads the whole tree of the parent into
+    the temporary index, so the cost still grows with the number of files in the
+    repository.
+
+    Args:
+        files: New contents by path in the working tree
+        message: Commit message
+        branch_name: Name of the new branch
+        parent: Branch name, tag or commit to base the commit on
+        cwd: Directory inside the git working tree, the current directory if None.
+            Defaults to None.
+
+    Returns:
+        Hash of the new commit
+
+    Raises:
+        RuntimeError: If the branch already exists or a git command failed
+    """
+    root = get_repo_root(cwd=cwd)
+    parent_commit = resolve_commit(ref=parent, cwd=cwd)
+    paths = {
+        get_repo_path(file_path=file_path, root=root): text
+        for file_path, text in files.items()
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {"GIT_INDEX_FILE": str(Path(tmp_dir) / "index")}
+        utils.run_shell_command(["git", "read-tree", parent_commit], cwd=root, env=env)
+
+        # keep the mode (e.g. executable bit) of existing files
+        staged = utils.run_shell_command(
+            ["git", "ls-files", "--stage", "-z", "--", *paths],
+            cwd=root,
+            env=env,
+        )
+        modes: dict[str, str] = {}
+
+        for entry in staged.stdout.split("\0"):
+            if len(entry) > 0:
+                info, path = entry.split("\t", maxsplit=1)
+                modes[path] = info.split()[0]
+
+        index_info: list[str] = []
+
+        for path, text in paths.items():
+            blob = utils.run_shell_command(
+                ["git", "hash-object", "-w", "--stdin", f"--path={path}"],
+                cwd=root,
+                stdin=text.encode(),
+                binary=True,
+            )
+            mode = modes.get(path, DEFAULT_FILE_MODE)
+            index_info.append(f"{mode} {blob.stdout.decode().strip()}\t{path}\n")
+
+        utils.run_shell_command(
+            ["git", "update-index", "--index-info"],
+            cwd=root,
+            stdin="".join(index_info),
+            env=env,
+        )
+        tree = utils.run_shell_command(["git", "write-tree"], cwd=root, env=env)
+
+    commit = utils.run_shell_command(
+        ["git", "commit-tree", tree.stdout.strip(), "-p", parent_commit, "-F", "-"],
+        cwd=root,
+        stdin=message,
+    ).stdout.strip()
+
+    # an empty old value makes sure an existing branch is not overwritten
+    utils.run_shell_command(
+        [
+            "git",
+            "update-ref",
+            "-m",
+            f"upgrade-dependencies: {message.splitlines()[0]}",
+            f"refs/heads/{branch_name}",
+            commit,
+            "",
+        ],
+        cwd=root,
+    )
+
+    return commit
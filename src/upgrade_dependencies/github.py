@@ -0,0 +1,376 @@
+"""GitHub API backends, batched GraphQL releases and REST pull requests."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+import upgrade_dependencies.tracing as tracing
+from upgrade_dependencies.dependency import ReleaseInfo
+
+if TYPE_CHECKING:
+    import httpx
+
+    from upgrade_dependencies.cache import ResponseCache
+    from upgrade_dependencies.dependency import GitHubDependency
+
+GRAPHQL_BATCH_SIZE = 50
+
+# https://host/owner/repo(.git), ssh://git@host/owner/repo(.git) or git@host:owner/repo
+REMOTE_URL = re.compile(
+    r"^(?:[a-z+]+://(?:[^@/]+@)?[^/]+/|[^@/:]+@[^:/]+:)([^/]+)/([^/]+?)(?:\.git)?/?$",
+)
+
+REPOSITORY_FIELDS = """
+    latestRelease { tagName publishedAt }
+    refs(
+        refPrefix: "refs/tags/"
+        first: 1
+        orderBy: {field: TAG_COMMIT_DATE, direction: DESC}
+    ) { nodes { name } }
+"""
+
+
+def build_release_query(repos: list[tuple[str, str]]) -> tuple[str, dict[str, str]]:
+    """Builds a GraphQL query for the latest release of many repositories.
+
+    Each repository is requested under the alias ``r{idx}``, owner and repository
+    names are passed as variables.
+
+    Args:
+        repos: List of (owner, repo) pairs
+
+    Returns:
+        Query and variables
+    """
+    params: list[str] = []
+    fields: list[str] = []
+    variables: dict[str, str] = {}
+
+    for idx, (owner, repo) in enumerate(repos):
+        params.append(f"$o{idx}: String!, $n{idx}: String!")
+        repository = f"repository(owner: $o{idx}, name: $n{idx})"
+        fields.append(f"r{idx}: {repository} {{{REPOSITORY_FIELDS}}}")
+        variables[f"o{idx}"] = owner
+        variables[f"n{idx}"] = repo
+
+    joined_fields = "\n".join(fields)
+    query = f"query({', '.join(params)}) {{\n{joined_fields}\n}}"
+
+    return query, variables
+
+
+def parse_repository(data: dict[str, Any] | None) -> ReleaseInfo | None:
+    """Extracts the latest release facts from a GraphQL repository result.
+
+    The latest release is used if the repository has one, otherwise the most recent
+    tag is used.
+
+    Args:
+        data: ``repository`` result of the release query
+
+    Returns:
+        Latest release facts, None if the repository or a release/tag was not found
+    """
+    if data is None:
+        return None
+
+    release = data.get("latestRelease")
+
+    if release is not None:
+        published_at = release.get("publishedAt")
+        released = (
+            None if published_at is None else datetime.fromisoformat(published_at)
+        )
+
+        return ReleaseInfo(version=release["tagName"], released=released)
+
+    refs: dict[str, Any] = data.get("refs") or {}
+    tags: list[dict[str, Any]] = refs.get("nodes") or []
+
+    if len(tags) > 0:
+        return ReleaseInfo(version=tags[0]["name"])
+
+    return None
+
+
+async def fetch_latest_releases(
+    client: httpx.AsyncClient,
+    dependencies: list[GitHubDependency],
+    cache: ResponseCache | None = None,
+    batch_size: int = GRAPHQL_BATCH_SIZE,
+) -> None:
+    """Fetches the latest release of many GitHub dependencies with GraphQL.
+
+    Repositories are de-duplicated and resolved ``batch_size`` at a time in a single
+    query each, asking only for the release tag and publish time. Fresh cache entries
+    (shared with the REST backend) are used without a request. A failed batch does not
+    stop the remaining batches, the releases that were found are always saved. The
+    GraphQL API requires an authenticated client.
+
+    Args:
+        client: Authenticated GitHub API client
+        dependencies: GitHub dependencies to fetch the latest release for
+        cache: Response cache. Defaults to None.
+        batch_size: Maximum number of repositories per query. Defaults to
+            ``GRAPHQL_BATCH_SIZE``.
+
+    Raises:
+        RuntimeError: If a query failed or a repository has no release or tag
+    """
+    import httpx
+
+    # group dependencies by repository, using fresh cache entries where possible
+    pending: dict[tuple[str, str], list[GitHubDependency]] = {}
+
+    for dep in dependencies:
+        key = str(client.base_url.join(dep.release_url))
+        entry = None if cache is None else cache.get(url=key)
+
+        if cache is not None and entry is not None and cache.is_fresh(entry=entry):
+            dep.release = ReleaseInfo.from_dict(data=entry.data, etag=entry.etag)
+        else:
+            pending.setdefault((dep.owner, dep.repo), []).append(dep)
+
+    repos = list(pending)
+    missing: list[str] = []
+    errors: list[str] = []
+
+    for start in range(0, len(repos), batch_size):
+        batch = repos[start : start + batch_size]
+        query, variables = build_release_query(repos=batch)
+
+        try:
+            with tracing.span(
+                "graphql",
+                category="http",
+                asynchronous=True,
+                repositories=len(batch),
+            ):
+                response = await client.post(
+                    url="/graphql",
+                    json={"query": query, "variables": variables},
+                )
+        except (httpx.HTTPError, RuntimeError) as e:
+            errors.append(f"{', '.join(f'{o}/{r}' for o, r in batch)}: {e}")
+            continue
+
+        if response.status_code != 200:
+            msg = f"{response.status_code} - {response.reason_phrase}."
+            errors.append(f"{', '.join(f'{o}/{r}' for o, r in batch)}: {msg}")
+            continue
+
+        # a body that isn't a JSON object (e.g. an HTML error page from a proxy)
+        try:
+            data: dict[str, Any] = response.json().get("data") or {}
+        except (ValueError, AttributeError):
+            msg = "Invalid JSON response."
+            errors.append(f"{', '.join(f'{o}/{r}' for o, r in batch)}: {msg}")
+            continue
+
+        for idx, (owner, repo) in enumerate(batch):
+            release = parse_repository(data=data.get(f"r{idx}"))
+
+            if release is None:
+                missing.append(f"{owner}/{repo}")
+                continue
+
+            for dep in pending[(owner, repo)]:
+                dep.release = release
+
+            if cache is not None:
+                key = str(client.base_url.join(pending[(owner, repo)][0].release_url))
+                cache.set(url=key, data=release.to_dict(), headers=httpx.Headers())
+
+    if len(missing) > 0:
+        errors.append(f"Cannot find a release or tag for {', '.join(missing)}.")
+
+    if len(errors) > 0:
+        raise RuntimeError("\n".join(errors))
+
+
+@dataclass(frozen=True)
+class PullRequest:
+    """Pull request to create.
+
+    Attributes:
+        title: Title of the pull request
+        body: Body of the pull request
+        head: Name of the branch with the changes
+        base: Name of the branch to merge the pull request to
+        labels: Labels to add to the pull request
+        assignees: Logins of the users to assign, ``@me`` is the authenticated user
+    """
+
+    title: str
+    body: str
+    head: str
+    base: str
+    labels: tuple[str, ...] = ("dependencies",)
+    assignees: tuple[str, ...] = ("@me",)
+
+
+def parse_remote_url(url: str) -> tuple[str, str] | None:
+    """Gets the owner and repository name from a git remote URL.
+
+    Args:
+        url: Remote URL, e.g. ``https://github.com/owner/repo.git`` or
+            ``git@github.com:owner/repo.git``
+
+    Returns:
+        Owner and repository name, None if the URL is not a hosted repository (e.g. a
+        local path)
+    """
+    match = REMOTE_URL.match(url.strip())
+
+    if match is None:
+        return None
+
+    return match.group(1), match.group(2)
+
+
+def check_response(
+    response: httpx.Response,
+    expected: int,
+) -> None:
+    """Raises an error if a GitHub REST API request failed.
+
+    Args:
+        response: Response
+        expected: Status code of a successful response
+
+    Raises:
+        RuntimeError: If the response does not have the expected status code
+    """
+    if response.status_code != expected:
+        msg = f"{response.status_code} - {response.reason_phrase}."
+
+        try:
+            message = response.json().get("message")
+        except ValueError:
+            message = None
+
+        if message:
+            msg += f" {message}"
+
+        raise RuntimeError(msg)
+
+
+async def create_pull_request(
+    client: httpx.AsyncClient,
+    owner: str,
+    repo: str,
+    pull_request: PullRequest,
+    login: str | None = None,
+) -> str:
+    """Creates a pull request with the REST API, then sets its labels and assignees.
+
+    The labels and assignees are set together with a single request.
+
+    Args:
+        client: Authenticated GitHub API client
+        owner: Owner of the repository
+        repo: Name of the repository
+        pull_request: Pull request to create
+        login: Login of the authenticated user, replaces ``@me`` in the assignees.
+            Defaults to None.
+
+    Returns:
+        URL of the pull request
+
+    Raises:
+        RuntimeError: If a request failed
+    """
+    response = await client.post(
+        url=f"/repos/{owner}/{repo}/pulls",
+        json={
+            "title": pull_request.title,
+            "body": pull_request.body,
+            "head": pull_request.head,
+            "base": pull_request.base,
+        },
+    )
+    check_response(response=response, expected=201)
+    data: dict[str, Any] = response.json()
+
+    assignees = [
+        login if assignee == "@me" and login is not None else assignee
+        for assignee in pull_request.assignees
+    ]
+    issue: dict[str, list[str]] = {}
+
+    if len(pull_request.labels) > 0:
+        issue["labels"] = list(pull_request.labels)
+
+    if len(assignees) > 0:
+        issue["assignees"] = assignees
+
+    if len(issue) > 0:
+        response = await client.patch(
+            url=f"/repos/{owner}/{repo}/issues/{data['number']}",
+            json=issue,
+        )
+        check_response(response=response, expected=200)
+
+    return data["html_url"]
+
+
+async def create_pull_requests(
+    client: httpx.AsyncClient,
+    owner: str,
+    repo: str,
+    pull_requests: list[PullRequest],
+) -> list[str | Exception]:
+    """Creates many pull requests concurrently with the REST API.
+
+    The login of the authenticated user is looked up once if any pull request is
+    assigned to ``@me``. A failed pull request does not stop the others.
+
+    Args:
+        client: Authenticated GitHub API client
+        owner: Owner of the repository
+        repo: Name of the repository
+        pull_requests: Pull requests to create
+
+    Returns:
+        URL of each pull request, or the error if it could not be created
+    """
+    import asyncio
+
+    import httpx
+
+    login = None
+
+    if any("@me" in pr.assignees for pr in pull_requests):
+        try:
+            response = await client.get(url="/user")
+            check_response(response=response, expected=200)
+            login = response.json()["login"]
+        except (httpx.HTTPError, RuntimeError) as e:
+            return [e] * len(pull_requests)
+
+    results = await asyncio.gather(
+        *[
+            create_pull_request(
+                client=client,
+                owner=owner,
+                repo=repo,
+                pull_request=pr,
+                login=login,
+            )
+            for pr in pull_requests
+        ],
+        return_exceptions=True,
+    )
+
+    urls: list[str | Exception] = []
+
+    for result in results:
+        if not isinstance(result, str | Exception):
+            raise result  # e.g. cancelled
+
+        urls.append(result)
+
+    return urls
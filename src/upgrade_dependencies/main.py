@@ -1,42 +1,652 @@
-"""CLI package."""
+"""CLI package.
+
+Only what every command needs is imported here. The HTTP stack (httpx), the YAML
+parser (ruamel), the requirement parser (packaging), the progress display, SQLite and
+the thread pool are imported when first used, keeping the start-up time of short
+commands such as ``--help`` low.
+"""
+
+from __future__ import annotations
 
-import asyncio
 import os
-from typing import TYPE_CHECKING, Annotated
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Any
 
 import typer
-from packaging.version import Version
 from rich import print as rprint
 from rich.console import Group
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.text import Text
 
+import upgrade_dependencies.git as git
+import upgrade_dependencies.tracing as tracing
 import upgrade_dependencies.utils as utils
-from upgrade_dependencies.dependency import GitHubDependency, PyPIDependency
+from upgrade_dependencies.cache import ResponseCache, default_cache_dir
+from upgrade_dependencies.dependency import (
+    Dependency,
+    GitHubDependency,
+    PyPIDependency,
+)
+from upgrade_dependencies.github import PullRequest, parse_remote_url
 from upgrade_dependencies.project import Project
 
 if TYPE_CHECKING:
-    from upgrade_dependencies.dependency import Dependency
+    import threading
 
 app = typer.Typer()
 GH_PAT = os.getenv("GH_PAT")
+GH_API_URL = os.getenv("GH_API_URL")
+PYPI_URL = os.getenv("PYPI_URL")
+CACHE_DIR = default_cache_dir()
+SNAPSHOT_PATH = CACHE_DIR / "snapshot.db"
+state: dict[str, Any] = {"offline": False, "snapshot": SNAPSHOT_PATH}
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    offline: Annotated[
+        bool,
+        typer.Option(help="Resolve latest versions from the snapshot, no network I/O"),
+    ] = False,
+    snapshot: Annotated[
+        Path,
+        typer.Option(help="Path to the snapshot index"),
+    ] = SNAPSHOT_PATH,
+    trace: Annotated[
+        Path | None,
+        typer.Option(
+            help="Write the timings of the phases of the run to this file, in the "
+            "Chrome trace-event format (open in chrome://tracing or Perfetto)",
+        ),
+    ] = None,
+):
+    """Creates PRs for dependency updates in python projects."""
+    state["offline"] = offline
+    state["snapshot"] = snapshot
+
+    if trace is not None:
+        tracing.enable()
+        # written when the command finishes, also if it fails
+        ctx.call_on_close(lambda: tracing.write(file_path=trace))
+
+
+def create_project() -> Project:
+    """Creates the project in the current directory from the global options.
+
+    Returns:
+        Project
+    """
+    if state["offline"]:
+        from upgrade_dependencies.snapshot import Snapshot
+
+        try:
+            snapshot = Snapshot(path=state["snapshot"], readonly=True)
+        except ValueError as e:
+            rprint(f":no_entry_sign: {e}")
+            raise typer.Exit(code=1) from e
+    else:
+        snapshot = None
+
+    return Project(
+        gh_pat=GH_PAT,
+        cache=ResponseCache(cache_dir=CACHE_DIR),
+        snapshot=snapshot,
+        pypi_url=PYPI_URL,
+        github_url=GH_API_URL,
+    )
+
+
+def select_dependencies(
+    project: Project,
+    base: bool,
+    optional_deps: bool,
+    group_deps: bool,
+    github_actions: bool,
+    pre_commit: bool,
+) -> list[Dependency]:
+    """Selects the dependencies of the project in the chosen categories.
+
+    Args:
+        project: Project
+        base: Whether to include base dependencies
+        optional_deps: Whether to include optional dependencies
+        group_deps: Whether to include dependency groups
+        github_actions: Whether to include GitHub actions dependencies
+        pre_commit: Whether to include pre-commit dependencies
+
+    Returns:
+        Dependencies
+    """
+    deps: list[Dependency] = []
+
+    if base:
+        deps.extend(project.base_dependencies)
+
+    if optional_deps:
+        deps.extend(project.optional_dependencies)
+
+    if group_deps:
+        deps.extend(project.group_dependencies)
+
+    if github_actions:
+        deps.extend(project.github_actions_dependencies)
+
+    if pre_commit:
+        deps.extend(project.pre_commit_dependencies)
+
+    return deps
+
+
+def describe_bump(
+    dep: Dependency,
+    old_ver: str,
+    version: str,
+) -> tuple[str, str]:
+    """Describes the update of a dependency for the commit and pull request.
+
+    Args:
+        dep: Dependency
+        old_ver: Version before the update
+        version: Version after the update
+
+    Returns:
+        Commit message and pull request body
+    """
+    from packaging.version import Version
+
+    if isinstance(dep, GitHubDependency) and dep.action:
+        old_v = Version(old_ver)
+        v = Version(version)
+        old_ver = f"v{old_v.major}"
+        version = f"v{v.major}"
+
+    commit_message = f"Bump {dep.package_name} from {old_ver} to {version}"
+
+    if isinstance(dep, PyPIDependency):
+        url = f"https://pypi.org/project/{dep.package_name}"
+    elif isinstance(dep, GitHubDependency):
+        url = f"https://github.com/{dep.owner}/{dep.repo}"
+    else:
+        return commit_message, ""
+
+    pr_body = f"Bumps [{dep.package_name}]({url}) from {old_ver} to {version}."
+
+    return commit_message, pr_body
+
+
+def get_branch_name(
+    dep: Dependency,
+    version: str,
+) -> str:
+    """Gets the name of the branch that updates a dependency.
+
+    Args:
+        dep: Dependency
+        version: Version to update to
+
+    Returns:
+        Branch name
+    """
+    from packaging.version import Version
+
+    if isinstance(dep, GitHubDependency) and dep.action:
+        v = Version(version)
+        return f"dependency/{dep.short_name}-v{v.major}"
+
+    return f"dependency/{dep.short_name}-{version}"
+
+
+def create_pull_request_with_gh(pull_request: PullRequest) -> str:
+    """Creates a pull request with the GitHub CLI.
+
+    Args:
+        pull_request: Pull request to create
+
+    Returns:
+        Output of the GitHub CLI, the URL of the pull request
+    """
+    shell_args = ["gh", "pr", "create"]
+
+    for assignee in pull_request.assignees:
+        shell_args += ["-a", assignee]
+
+    shell_args += [
+        "--base",
+        pull_request.base,
+        "--body",
+        pull_request.body,
+        "--head",
+        pull_request.head,
+    ]
+
+    for label in pull_request.labels:
+        shell_args += ["--label", label]
+
+    pr = utils.run_shell_command([*shell_args, "--title", pull_request.title])
+
+    return pr.stdout.strip()
+
+
+def create_pull_requests(
+    project: Project,
+    pull_requests: list[PullRequest],
+) -> list[str | Exception]:
+    """Creates pull requests, with the GitHub REST API where possible.
+
+    The REST API (through the project's pooled GitHub client, creating all the pull
+    requests concurrently) is used if a GitHub PAT is set and the origin remote is a
+    hosted repository. Otherwise, and for the pull requests the REST API failed to
+    create, the GitHub CLI is used.
+
+    Args:
+        project: Project
+        pull_requests: Pull requests to create
+
+    Returns:
+        URL of each pull request, or the error if it could not be created
+    """
+    url = git.get_remote_url()
+    repo = None if url is None else parse_remote_url(url=url)
+
+    if project.gh_pat is None or repo is None:
+        urls: list[str | Exception] = []
+
+        for pull_request in pull_requests:
+            try:
+                urls.append(create_pull_request_with_gh(pull_request=pull_request))
+            except RuntimeError as e:
+                urls.append(e)
+
+        return urls
+
+    urls = project.create_pull_requests(
+        owner=repo[0],
+        repo=repo[1],
+        pull_requests=pull_requests,
+    )
+    gh_installed = shutil.which("gh") is not None
+
+    for idx, pull_request in enumerate(pull_requests):
+        error = urls[idx]
+
+        if not isinstance(error, Exception):
+            continue
+
+        if not gh_installed:
+            msg = f"{error}\nInstall the GitHub CLI (gh) to create it without the API."
+            urls[idx] = RuntimeError(msg)
+            continue
+
+        try:
+            urls[idx] = create_pull_request_with_gh(pull_request=pull_request)
+        except RuntimeError as e:
+            msg = f"{error}\nThe GitHub CLI also failed: {e}"
+            urls[idx] = RuntimeError(msg)
+
+    return urls
+
+
+def create_pull_request(
+    project: Project,
+    pull_request: PullRequest,
+) -> str:
+    """Creates a pull request, with the GitHub REST API where possible.
+
+    Args:
+        project: Project
+        pull_request: Pull request to create
+
+    Returns:
+        URL of the pull request
+
+    Raises:
+        RuntimeError: If the pull request could not be created
+    """
+    url = create_pull_requests(project=project, pull_requests=[pull_request])[0]
+
+    if isinstance(url, Exception):
+        msg = f"Failed to create the pull request: {url}"
+        raise RuntimeError(msg) from url
+
+    return url
+
+
+def lock_project(
+    files: dict[Path, str],
+    project_path: Path,
+    target_branch: str,
+) -> str:
+    """Runs uv lock on updated files in a throwaway git worktree.
+
+    The worktree is checked out from the target branch, so that workspace members,
+    path sources and the package sources (e.g. for dynamic metadata) are available
+    to uv. It is removed afterwards, the current checkout is never touched.
+
+    Args:
+        files: New contents by path in the working tree
+        project_path: Path to the project in the working tree
+        target_branch: Name of the branch to check out
+
+    Returns:
+        New contents of uv.lock
+
+    Raises:
+        RuntimeError: If uv lock failed or uv is not installed
+    """
+    root = git.get_repo_root()
+
+    with tempfile.TemporaryDirectory(prefix="upgrade-dependencies-") as tmp_dir:
+        worktree = Path(tmp_dir) / "worktree"
+        utils.run_shell_command(
+            ["git", "worktree", "add", "--detach", str(worktree), target_branch],
+        )
+
+        try:
+            for file_path, text in files.items():
+                path = worktree / git.get_repo_path(file_path=file_path, root=root)
+                path.write_text(text, newline="")
+
+            project_dir = worktree / git.get_repo_path(
+                file_path=project_path,
+                root=root,
+            )
+
+            try:
+                utils.run_shell_command(["uv", "lock"], cwd=project_dir)
+            except FileNotFoundError as e:
+                msg = "uv is not installed."
+                raise RuntimeError(msg) from e
+
+            with (project_dir / "uv.lock").open("r", newline="") as f:
+                return f.read()
+        finally:
+            utils.run_shell_command(
+                ["git", "worktree", "remove", "--force", str(worktree)],
+                suppress_errors=True,
+            )
+
+
+def commit_updates(
+    project: Project,
+    updates: list[tuple[Dependency, str]],
+    commit_message: str,
+    branch_name: str,
+    target_branch: str,
+) -> None:
+    """Commits dependency updates to a new branch, without touching the working tree.
+
+    The project files are read from the target branch and the dependencies located
+    in them, so the edits do not depend on uncommitted changes. The commit is created
+    on top of the target branch with git plumbing. If the target branch has a
+    uv.lock, uv lock is run on the updated files in a throwaway worktree, a warning
+    is shown if it fails and uv.lock is then left as it is.
+
+    Args:
+        project: Project, scanned from the working tree
+        updates: Dependencies of ``project`` and the versions to update them to
+        commit_message: Commit message
+        branch_name: Name of the new branch
+        target_branch: Name of the branch to base the commit on
+
+    Raises:
+        RuntimeError: If a dependency to update is not on the target branch
+    """
+    project_path = Path(project.project_path)
+    files: dict[Path, str] = {}
+
+    with tempfile.TemporaryDirectory(prefix="upgrade-dependencies-") as tmp_dir:
+        # scan the project files of the target branch
+        exported = git.export_files(
+            ref=target_branch,
+            paths=[
+                project_path / "pyproject.toml",
+                project_path / ".pre-commit-config.yaml",
+                project_path / ".github" / "workflows",
+            ],
+            base=project_path,
+            dest=Path(tmp_dir),
+        )
+
+        try:
+            target = Project(project_path=tmp_dir)
+        except ValueError as e:
+            msg = f"pyproject.toml is not on the {target_branch} branch."
+            raise RuntimeError(msg) from e
+
+        try:
+            dependencies = target.match_dependencies(
+                other=project,
+                dependencies=[dep for dep, _ in updates],
+            )
+        except RuntimeError as e:
+            msg = f"{e} It is not on the {target_branch} branch."
+            raise RuntimeError(msg) from e
+
+        edits = target.plan_updates(
+            updates=[
+                (dep, version)
+                for dep, (_, version) in zip(dependencies, updates, strict=True)
+            ],
+        )
+
+        for file_path, file_edits in edits.items():
+            files[project_path / file_path.relative_to(tmp_dir)] = utils.render_edits(
+                file_path=file_path,
+                edits=file_edits,
+            )
+
+        for file_path in exported:
+            utils.yml_cache.pop((file_path.resolve(), True), None)
+            utils.yml_cache.pop((file_path.resolve(), False), None)
+
+    # relock, the commit is still created if it fails
+    pyproject_path = project_path / "pyproject.toml"
+    lock_path = project_path / "uv.lock"
+    lock = git.read_file(ref=target_branch, file_path=lock_path)
+
+    if pyproject_path in files and lock is not None:
+        try:
+            new_lock = lock_project(
+                files=files,
+                project_path=project_path,
+                target_branch=target_branch,
+            )
+        except RuntimeError as e:
+            rprint(
+                f":warning: [bold]uv lock failed, uv.lock is not updated![/bold] {e}",
+            )
+        else:
+            if new_lock != lock:
+                files[lock_path] = new_lock
+
+    git.commit_files(
+        files=files,
+        message=commit_message,
+        branch_name=branch_name,
+        parent=target_branch,
+    )
+
+
+def update_in_worktree(
+    project: Project,
+    dependencies: list[Dependency],
+    version: str,
+    branch_name: str,
+    target_branch: str,
+    worktrees_dir: Path,
+    prefix: str,
+    lock: threading.Lock,
+) -> PullRequest:
+    """Updates a dependency and pushes it to a new branch from a new git worktree.
+
+    The worktree is checked out from ``target_branch`` into ``worktrees_dir`` and
+    removed afterwards, the current checkout is never touched. If the update fails
+    before the branch is pushed, the branch is deleted too. Steps that cannot run
+    concurrently (worktree bookkeeping, and file edits which share the YAML parsers)
+    hold ``lock``.
+
+    Args:
+        project: Project the dependencies belong to
+        dependencies: Every place the dependency is specified in the project
+        version: Version to update to
+        branch_name: Name of the new branch
+        target_branch: Name of the branch to merge the pull request to
+        worktrees_dir: Directory to create the worktree in
+        prefix: Path of the project relative to the root of the repository
+        lock: Lock shared by all the concurrent updates
+
+    Returns:
+        Pull request to create for the pushed branch
+    """
+    worktree = worktrees_dir / branch_name.replace("/", "-")
+    pushed = False
+
+    with lock:
+        utils.run_shell_command(
+            ["git", "worktree", "add", "-b", branch_name, str(worktree), target_branch],
+        )
+
+    try:
+        project_path = worktree / prefix
+
+        # update dependency, located in the files of the target branch
+        with lock:
+            target = Project(project_path=str(project_path))
+            deps = target.match_dependencies(other=project, dependencies=dependencies)
+            dep = deps[0]
+            old_ver = str(sorted(dep.specifier, key=str)[0].version)
+            target.update_dependencies(updates=[(d, version) for d in deps])
+
+        # run uv.lock, don't worry if it doesn't work (i.e. uv not installed)
+        utils.run_shell_command(["uv", "lock"], suppress_errors=True, cwd=project_path)
+
+        # commit the changes, the worktree only has the changes of this update
+        commit_message, pr_body = describe_bump(
+            dep=dep,
+            old_ver=old_ver,
+            version=version,
+        )
+        utils.run_shell_command(["git", "add", "--all"], cwd=worktree)
+        utils.run_shell_command(["git", "commit", "-m", commit_message], cwd=worktree)
+
+        # push the branch to GitHub
+        utils.run_shell_command(["git", "push", "origin", branch_name], cwd=worktree)
+        pushed = True
+
+        return PullRequest(
+            title=commit_message,
+            body=pr_body,
+            head=branch_name,
+            base=target_branch,
+        )
+    finally:
+        with lock:
+            utils.run_shell_command(
+                ["git", "worktree", "remove", "--force", str(worktree)],
+                suppress_errors=True,
+            )
+
+            # the branch can only be deleted once its worktree is removed
+            if not pushed:
+                utils.run_shell_command(
+                    ["git", "branch", "-D", branch_name],
+                    suppress_errors=True,
+                )
+
+
+def update_in_worktrees(
+    project: Project,
+    bumps: list[tuple[Dependency, str]],
+    target_branch: str,
+    jobs: int,
+) -> list[tuple[Dependency, str | Exception]]:
+    """Updates dependencies concurrently, one git worktree and pull request each.
+
+    Dependencies updated on the same branch (e.g. a package specified in both the
+    base dependencies and a group) are updated together. The branches are pushed
+    concurrently, then all the pull requests are created in one batch.
+
+    Args:
+        project: Project
+        bumps: Dependencies and the versions to update them to
+        target_branch: Name of the branch to merge the pull requests to
+        jobs: Maximum number of concurrent updates
+
+    Returns:
+        First dependency of every branch and the URL of its pull request, or the
+        error
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    prefix = utils.run_shell_command(["git", "rev-parse", "--show-prefix"]).stdout
+    worktrees_dir = Path(tempfile.mkdtemp(prefix="upgrade-dependencies-"))
+    lock = threading.Lock()
+    branches: dict[str, tuple[list[Dependency], str]] = {}
+    prs: dict[str, str | Exception] = {}
+    pull_requests: dict[str, PullRequest] = {}
+
+    for dep, version in bumps:
+        branch_name = get_branch_name(dep=dep, version=version)
+        branches.setdefault(branch_name, ([], version))[0].append(dep)
+
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                branch_name: pool.submit(
+                    update_in_worktree,
+                    project=project,
+                    dependencies=deps,
+                    version=version,
+                    branch_name=branch_name,
+                    target_branch=target_branch,
+                    worktrees_dir=worktrees_dir,
+                    prefix=prefix.strip(),
+                    lock=lock,
+                )
+                for branch_name, (deps, version) in branches.items()
+            }
+
+        for branch_name, future in futures.items():
+            error = future.exception()
+
+            if isinstance(error, Exception):
+                prs[branch_name] = error
+            else:
+                pull_requests[branch_name] = future.result()
+    finally:
+        shutil.rmtree(worktrees_dir, ignore_errors=True)
+        utils.run_shell_command(["git", "worktree", "prune"], suppress_errors=True)
+
+    urls = create_pull_requests(
+        project=project,
+        pull_requests=list(pull_requests.values()),
+    )
+    prs.update(zip(pull_requests, urls, strict=True))
+
+    return [(deps[0], prs[branch_name]) for branch_name, (deps, _) in branches.items()]
 
 
 @app.command()
 def list_dependencies():
     """List all the dependencies for the project."""
-    project = Project(gh_pat=GH_PAT)
+    project = create_project()
 
     # base dependencies
     title = Text("Base Dependencies", style="bold")
     text = Text()
 
-    for idx, base_dep in enumerate(project.base_dependencies):
+    base_dependencies = project.base_dependencies
+
+    for idx, base_dep in enumerate(base_dependencies):
         text.append(base_dep.package_plus_extras)
         text.append(str(base_dep.specifier), style="green")
 
-        if idx < len(project.base_dependencies) - 1:
+        if idx < len(base_dependencies) - 1:
             text.append("\n")
 
     rprint(Panel(text, title=title, title_align="left"))
@@ -91,14 +701,16 @@ def list_dependencies():
     title = Text("Github Actions Dependencies", style="bold")
     text = Text()
 
-    for idx, gh_dep in enumerate(project.github_actions_dependencies):
+    github_actions_dependencies = project.github_actions_dependencies
+
+    for idx, gh_dep in enumerate(github_actions_dependencies):
         text.append(gh_dep.package_name)
         text.append(str(gh_dep.specifier), style="green")
 
-        if idx < len(project.github_actions_dependencies) - 1:
+        if idx < len(github_actions_dependencies) - 1:
             text.append("\n")
 
-    if len(project.github_actions_dependencies) > 0:
+    if len(github_actions_dependencies) > 0:
         rprint()
         rprint(Panel(text, title=title, title_align="left"))
 
@@ -106,14 +718,16 @@ def list_dependencies():
     title = Text("Pre-commit Dependencies", style="bold")
     text = Text()
 
-    for idx, pc_dep in enumerate(project.pre_commit_dependencies):
+    pre_commit_dependencies = project.pre_commit_dependencies
+
+    for idx, pc_dep in enumerate(pre_commit_dependencies):
         text.append(pc_dep.package_name)
         text.append(str(pc_dep.specifier), style="green")
 
-        if idx < len(project.pre_commit_dependencies) - 1:
+        if idx < len(pre_commit_dependencies) - 1:
             text.append("\n")
 
-    if len(project.pre_commit_dependencies) > 0:
+    if len(pre_commit_dependencies) > 0:
         rprint()
         rprint(Panel(text, title=title, title_align="left"))
 
@@ -123,7 +737,9 @@ def check_dependency(
     dependency: Annotated[str, typer.Argument(help="Name of the dependency to check")],
 ):
     """Checks whether a dependency needs updating."""
-    project = Project(gh_pat=GH_PAT)
+    from packaging.version import InvalidVersion
+
+    project = create_project()
 
     try:
         dep = project.get_dependency(name=dependency)
@@ -131,13 +747,19 @@ def check_dependency(
         rprint(f"Cannot find {dependency} in {project.name}.")
         raise typer.Exit(code=1) from e
 
-    if isinstance(dep, GitHubDependency):
-        asyncio.run(dep.save_data(gh_pat=GH_PAT))
-    else:
-        asyncio.run(dep.save_data())
+    project.fetch_all_data(dependencies=[dep])
+
+    if dep.release is None:
+        raise typer.Exit(code=1)
+
+    try:
+        needs_update = dep.needs_update()
+    except InvalidVersion as e:
+        tag = dep.get_release().version
+        rprint(f":no_entry_sign: {dep.package_name} has no comparable release ({tag}).")
+        raise typer.Exit(code=1) from e
 
     title = Text("Dependency Check", style="bold")
-    needs_update = dep.needs_update()
 
     text = Text(dep.package_name)
     text.append(str(dep.specifier), style="green")
@@ -173,40 +795,50 @@ def needs_updating(
     ] = True,
 ):
     """Lists the dependencies that need updating."""
+    from packaging.version import InvalidVersion
+
     # create project object
-    project = Project(gh_pat=GH_PAT)
+    project = create_project()
 
     # fetch relevant data
-    if base or optional_deps or group_deps:
-        project.pypi_dependency_data_async()
-
-    if github_actions or pre_commit:
-        project.github_dependency_data_async()
+    project.fetch_all_data(
+        pypi=base or optional_deps or group_deps,
+        github=github_actions or pre_commit,
+    )
 
     title = Text("Dependencies to Update", style="bold")
     text = Text()
-    deps: list[Dependency] = []
-
-    if base:
-        deps.extend(project.base_dependencies)
-
-    if optional_deps:
-        deps.extend(project.optional_dependencies)
-
-    if group_deps:
-        deps.extend(project.group_dependencies)
-
-    if github_actions:
-        deps.extend(project.github_actions_dependencies)
-
-    if pre_commit:
-        deps.extend(project.pre_commit_dependencies)
+    deps = select_dependencies(
+        project=project,
+        base=base,
+        optional_deps=optional_deps,
+        group_deps=group_deps,
+        github_actions=github_actions,
+        pre_commit=pre_commit,
+    )
 
     # use a counter to help with new lines
     counter = 0
 
     for dep in deps:
-        if dep.needs_update():
+        # skip dependencies whose data could not be fetched
+        if dep.release is None:
+            continue
+
+        # the latest tag of a repository without releases may not be a version
+        try:
+            needs_update = dep.needs_update()
+        except InvalidVersion:
+            if counter > 0:
+                text.append("\n")
+
+            text.append(f"{dep.package_name}: ")
+            text.append(str(dep.specifier), style="yellow")
+            text.append(f" -> no comparable release ({dep.get_release().version})")
+            counter += 1
+            continue
+
+        if needs_update:
             if counter > 0:
                 text.append("\n")
 
@@ -219,7 +851,8 @@ def needs_updating(
     if counter == 0:
         text.append("All version are up to date!")
 
-    rprint(Panel(text, title=title, title_align="left"))
+    with tracing.span("render", category="cli"):
+        rprint(Panel(text, title=title, title_align="left"))
 
 
 @app.command()
@@ -240,40 +873,49 @@ def latest_versions(
     ] = True,
 ):
     """List the dependencies that aren't specified to the latest version."""
+    from packaging.version import InvalidVersion
+
     # create project object
-    project = Project(gh_pat=GH_PAT)
+    project = create_project()
 
     # fetch relevant data
-    if base or optional_deps or group_deps:
-        project.pypi_dependency_data_async()
-
-    if github_actions or pre_commit:
-        project.github_dependency_data_async()
+    project.fetch_all_data(
+        pypi=base or optional_deps or group_deps,
+        github=github_actions or pre_commit,
+    )
 
     title = Text("Latest Versions", style="bold")
     text = Text()
-    deps: list[Dependency] = []
-
-    if base:
-        deps.extend(project.base_dependencies)
-
-    if optional_deps:
-        deps.extend(project.optional_dependencies)
-
-    if group_deps:
-        deps.extend(project.group_dependencies)
-
-    if github_actions:
-        deps.extend(project.github_actions_dependencies)
-
-    if pre_commit:
-        deps.extend(project.pre_commit_dependencies)
+    deps = select_dependencies(
+        project=project,
+        base=base,
+        optional_deps=optional_deps,
+        group_deps=group_deps,
+        github_actions=github_actions,
+        pre_commit=pre_commit,
+    )
 
     # use a counter to help with new lines
     counter = 0
 
     for dep in deps:
-        if not dep.is_specifier_latest():
+        # skip dependencies whose data could not be fetched
+        if dep.release is None:
+            continue
+
+        try:
+            is_latest = dep.is_specifier_latest()
+        except InvalidVersion:
+            if counter > 0:
+                text.append("\n")
+
+            text.append(f"{dep.package_name}: ")
+            text.append(str(dep.specifier), style="yellow")
+            text.append(f" -> no comparable release ({dep.get_release().version})")
+            counter += 1
+            continue
+
+        if not is_latest:
             if counter > 0:
                 text.append("\n")
 
@@ -303,20 +945,27 @@ def update(
 ):
     """Updates a dependency to a specific (or latest) version.
 
-    Makes changes to the dependency specification locally and creates a GitHub pull
-    request on a new branch (branch name = dependency/{package_name}-{version}). Make
-    sure this branch name does not exist locally or on GitHub.
+    Commits the change to the dependency specification to a new branch (branch name =
+    dependency/{package_name}-{version}) off the target branch and creates a GitHub
+    pull request. Make sure this branch name does not exist locally or on GitHub.
 
-    Requires git and the GitHub CLI to be installed. It is recommended to have a clean
-    git before running this command.
+    The dependency is located in the files of the target branch and the commit is
+    created without checking out the branch, the working tree and any uncommitted
+    changes are left untouched. If the target branch has a uv.lock, uv lock is run in
+    a throwaway git worktree.
+
+    Requires git. The pull request is created with the GitHub API if GH_PAT is set,
+    otherwise with the GitHub CLI.
     """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         transient=True,
     ) as progress:
         task = progress.add_task("Creating project...")
-        project = Project(gh_pat=GH_PAT)
+        project = create_project()
 
         # search for dependency and save old version
         try:
@@ -329,112 +978,320 @@ def update(
         # fetch data from pypi/github
         progress.update(task, description="Fetching dependency data...")
 
-        if isinstance(dep, GitHubDependency):
-            asyncio.run(dep.save_data(gh_pat=GH_PAT))
-        else:
-            asyncio.run(dep.save_data())
+        project.fetch_all_data(dependencies=[dep])
 
         # get latest/desired version
         if version is None:
+            if dep.release is None:
+                raise typer.Exit(code=1)
+
             version = str(dep.get_latest_version())
 
-        # create new branch
-        progress.update(task, description="Creating new branch...")
-        if isinstance(dep, GitHubDependency) and dep.action:
-            v = Version(version)
-            branch_name = f"dependency/{dep.short_name}-v{v.major}"
-        else:
-            branch_name = f"dependency/{dep.short_name}-{version}"
+        # commit the update to a new branch, leaving the working tree untouched
+        progress.update(task, description="Committing changes...")
+        branch_name = get_branch_name(dep=dep, version=version)
+        commit_message, pr_body = describe_bump(
+            dep=dep,
+            old_ver=old_ver,
+            version=version,
+        )
 
-        utils.run_shell_command(["git", "checkout", "-b", branch_name])
+        try:
+            commit_updates(
+                project=project,
+                updates=[(dep, version)],
+                commit_message=commit_message,
+                branch_name=branch_name,
+                target_branch=target_branch,
+            )
+        except RuntimeError as e:
+            progress.stop()
+            rprint(f":no_entry_sign: {e}")
+            raise typer.Exit(code=1) from e
 
-        # get status of files before changes
-        progress.update(task, description="Updating dependency...")
-        files_before = utils.get_git_status()
+        # push the branch to GitHub
+        progress.update(task, description="Pushing changes to GitHub...")
+        utils.run_shell_command(["git", "push", "origin", branch_name])
 
-        # warning if there are changed files
-        if len(files_before) > 0:
-            msg = ":warning-emoji: [italic]There are uncomitted changes in your current"
-            msg += " branch. upgrade-dependencies will only commit files that were"
-            msg += " unmodified prior to running [bold]update[/bold][/italic]."
-            rprint(msg)
+        # create pull request
+        progress.update(task, description="Creating pull request...")
+        pr = create_pull_request(
+            project=project,
+            pull_request=PullRequest(
+                title=commit_message,
+                body=pr_body,
+                head=branch_name,
+                base=target_branch,
+            ),
+        )
 
-        # update dependency
-        project.update_dependency(dependency=dep, version=version)
+    msg = f"✅ [bold]{dep.package_name}[/bold] updated! View the pull request at"
+    msg += f" {pr}"
+    rprint(msg)
 
-        # run uv.lock, don't worry if it doesn't work (i.e. uv not installed)
-        utils.run_shell_command(["uv", "lock"], suppress_errors=True)
 
-        # get status of files after changes
-        files_after = utils.get_git_status()
+@app.command()
+def update_all(
+    base: Annotated[bool, typer.Option(help="Include base dependencies")] = True,
+    optional_deps: Annotated[
+        bool,
+        typer.Option(help="Include optional dependencies"),
+    ] = True,
+    group_deps: Annotated[bool, typer.Option(help="Include dependency groups")] = True,
+    github_actions: Annotated[
+        bool,
+        typer.Option(help="Include GitHub actions dependencies"),
+    ] = True,
+    pre_commit: Annotated[
+        bool,
+        typer.Option(help="Include pre-commit dependencies"),
+    ] = True,
+    target_branch: Annotated[
+        str,
+        typer.Option(help="Name of the branch to merge PR to"),
+    ] = "master",
+    branch_name: Annotated[
+        str | None,
+        typer.Option(
+            help="Name of the new branch, dependency/update-all-{date} by default",
+        ),
+    ] = None,
+    per_dependency: Annotated[
+        bool,
+        typer.Option(help="Create one pull request per dependency, in parallel"),
+    ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option(help="Maximum number of pull requests created at once"),
+    ] = 4,
+):
+    """Updates every dependency that needs updating to its latest version.
 
-        # get only the files that were changed
-        changed_files = [f for f in files_after if f not in files_before]
+    Commits the changes to all the dependency specifications in one pass, runs uv
+    lock once and creates a single GitHub pull request on a new branch (branch name =
+    dependency/update-all-{date} unless specified) off the target branch. Make sure
+    this branch name does not exist locally or on GitHub. The working tree is left
+    untouched.
 
-        # git add the changed files
-        utils.run_shell_command(["git", "add", *changed_files])
+    With --per-dependency, each dependency is updated in its own git worktree checked
+    out from the target branch, and gets its own pull request (branch name =
+    dependency/{package_name}-{version}) as with update. Up to --jobs dependencies are
+    updated concurrently, the current checkout is left untouched.
 
-        # commit the changes
-        progress.update(task, description="Committing changes...")
-        if isinstance(dep, GitHubDependency) and dep.action:
-            old_v = Version(old_ver)
-            v = Version(version)
-            commit_message = (
-                f"Bump {dep.package_name} from v{old_v.major} to v{v.major}"
+    Requires git. Pull requests are created with the GitHub API if GH_PAT is set,
+    otherwise with the GitHub CLI.
+    """
+    from packaging.version import InvalidVersion
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        transient=True,
+    ) as progress:
+        task = progress.add_task("Creating project...")
+        project = create_project()
+
+        # fetch data from pypi/github
+        progress.update(task, description="Fetching dependency data...")
+        project.fetch_all_data(
+            pypi=base or optional_deps or group_deps,
+            github=github_actions or pre_commit,
+        )
+
+        # select dependencies that need updating, every place a package is specified
+        # (e.g. in the base dependencies and a group) is bumped
+        bumps: list[tuple[Dependency, str, str]] = []
+
+        for dep in select_dependencies(
+            project=project,
+            base=base,
+            optional_deps=optional_deps,
+            group_deps=group_deps,
+            github_actions=github_actions,
+            pre_commit=pre_commit,
+        ):
+            # skip dependencies whose data could not be fetched
+            if dep.release is None:
+                continue
+
+            try:
+                needs_update = dep.needs_update()
+            except InvalidVersion:
+                tag = dep.get_release().version
+                rprint(
+                    f":no_entry_sign: [bold]{dep.package_name}[/bold] has no "
+                    f"comparable release ({tag}), skipping.",
+                )
+                continue
+
+            if needs_update:
+                old_ver = str(sorted(dep.specifier, key=str)[0].version)
+                version = str(dep.get_latest_version())
+                bumps.append((dep, old_ver, version))
+
+        if len(bumps) == 0:
+            progress.stop()
+            rprint("✅ All version are up to date!")
+            return
+
+        n_packages = len({dep.package_name for dep, _, _ in bumps})
+
+        if per_dependency:
+            progress.update(
+                task,
+                description=f"Creating {n_packages} pull requests...",
             )
-        else:
-            commit_message = f"Bump {dep.package_name} from {old_ver} to {version}"
+            prs = update_in_worktrees(
+                project=project,
+                bumps=[(dep, version) for dep, _, version in bumps],
+                target_branch=target_branch,
+                jobs=jobs,
+            )
+            progress.stop()
+
+            for dep, pr in prs:
+                name = dep.package_name
 
-        utils.run_shell_command(["git", "commit", "-m", commit_message])
+                if isinstance(pr, Exception):
+                    rprint(f":no_entry_sign: [bold]{name}[/bold] failed: {pr}")
+                else:
+                    rprint(f"✅ [bold]{name}[/bold] updated! {pr}")
+
+            if any(isinstance(pr, Exception) for _, pr in prs):
+                raise typer.Exit(code=1)
+
+            return
+
+        # commit all the updates to a new branch, leaving the working tree untouched
+        progress.update(task, description="Committing changes...")
+        if branch_name is None:
+            branch_name = f"dependency/update-all-{date.today().isoformat()}"
+
+        # the same bump of a package specified in many places is described once
+        descriptions = list(
+            dict.fromkeys(
+                describe_bump(dep=dep, old_ver=old_ver, version=version)
+                for dep, old_ver, version in bumps
+            ),
+        )
+        commit_message = f"Bump {n_packages} dependencies"
+        commit_body = "\n".join(f"- {message}" for message, _ in descriptions)
+
+        try:
+            commit_updates(
+                project=project,
+                updates=[(dep, version) for dep, _, version in bumps],
+                commit_message=f"{commit_message}\n\n{commit_body}",
+                branch_name=branch_name,
+                target_branch=target_branch,
+            )
+        except RuntimeError as e:
+            progress.stop()
+            rprint(f":no_entry_sign: {e}")
+            raise typer.Exit(code=1) from e
 
         # push the branch to GitHub
         progress.update(task, description="Pushing changes to GitHub...")
         utils.run_shell_command(["git", "push", "origin", branch_name])
 
-        # create pr_body
+        # create pull request
         progress.update(task, description="Creating pull request...")
-        if isinstance(dep, PyPIDependency):
-            url = f"https://pypi.org/project/{dep.package_name}"
-            pr_body = f"Bumps [{dep.package_name}]({url}) from {old_ver} to {version}."
-        elif isinstance(dep, GitHubDependency):
-            url = f"https://github.com/{dep.owner}/{dep.repo}"
-            if dep.action:
-                old_v = Version(old_ver)
-                v = Version(version)
-                pr_body = f"Bumps [{dep.package_name}]({url}) from v{old_v.major} to"
-                pr_body += f" v{v.major}."
-            else:
-                pr_body = (
-                    f"Bumps [{dep.package_name}]({url}) from {old_ver} to {version}."
-                )
-        else:
-            pr_body = ""
+        pr_body = "\n".join(f"- {body}" for _, body in descriptions)
+        pr = create_pull_request(
+            project=project,
+            pull_request=PullRequest(
+                title=commit_message,
+                body=pr_body,
+                head=branch_name,
+                base=target_branch,
+            ),
+        )
 
-        # create pull request
-        pr = utils.run_shell_command(
-            [
-                "gh",
-                "pr",
-                "create",
-                "-a",
-                "@me",
-                "--base",
-                target_branch,
-                "--body",
-                pr_body,
-                "--label",
-                "dependencies",
-                "--title",
-                commit_message,
-            ],
+    msg = f"✅ [bold]{n_packages}[/bold] dependencies updated! View the pull request"
+    msg += f" at {pr}"
+    rprint(msg)
+
+
+@app.command()
+def snapshot(
+    package: Annotated[
+        list[str] | None,
+        typer.Option(help="Additional PyPI package to include"),
+    ] = None,
+    repo: Annotated[
+        list[str] | None,
+        typer.Option(help="Additional GitHub repository (owner/repo) to include"),
+    ] = None,
+    project_deps: Annotated[
+        bool,
+        typer.Option(
+            "--project/--no-project",
+            help="Include the dependencies of the project in the current directory, "
+            "skipped if there is no pyproject.toml",
+        ),
+    ] = True,
+):
+    """Saves the latest versions of the dependencies to the snapshot index.
+
+    Downloads the latest release of every dependency of the project, and of any
+    additional PyPI packages and GitHub repositories, into a local SQLite index. An
+    existing snapshot is updated in place, so one snapshot can be shared by many
+    projects. Use --offline to resolve latest versions from the snapshot.
+    """
+    from packaging.specifiers import SpecifierSet
+
+    scan = project_deps and Path("pyproject.toml").exists()
+
+    if not scan and not package and not repo:
+        rprint(
+            ":no_entry_sign: No project to snapshot, run in a directory with a "
+            "pyproject.toml or use --package and --repo.",
         )
+        raise typer.Exit(code=1)
 
-        # re-checkout master branch
-        utils.run_shell_command(["git", "checkout", target_branch])
+    try:
+        project = Project(
+            gh_pat=GH_PAT,
+            cache=ResponseCache(cache_dir=CACHE_DIR),
+            pypi_url=PYPI_URL,
+            github_url=GH_API_URL,
+            scan=scan,
+        )
+    except ValueError as e:  # e.g. invalid pyproject.toml
+        rprint(f":no_entry_sign: {e}")
+        raise typer.Exit(code=1) from e
 
-    msg = f"✅ [bold]{dep.package_name}[/bold] updated! View the pull request at"
-    msg += f" {pr.stdout}"
-    rprint(msg)
+    # additional dependencies
+    deps: list[Dependency] = [
+        PyPIDependency(
+            package_name=pkg,
+            specifier=SpecifierSet(),
+            extras=[],
+            base=False,
+            group="snapshot",
+        )
+        for pkg in package or []
+    ]
+    deps.extend(
+        GitHubDependency(
+            package_name=gh_repo,
+            specifier=SpecifierSet(),
+            action=False,
+            pre_commit=False,
+        )
+        for gh_repo in repo or []
+    )
+    deps.extend(project.dependencies)
+
+    project.fetch_all_data(dependencies=deps)
+
+    from upgrade_dependencies.snapshot import Snapshot
+
+    with Snapshot(path=state["snapshot"]) as snap:
+        count = snap.save_dependencies(dependencies=deps)
+
+    rprint(f"✅ Saved {count} releases to {state['snapshot']}.")
 
 
 @app.command()
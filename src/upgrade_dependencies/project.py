@@ -1,16 +1,35 @@
 """Class for a python project."""
 
-import asyncio
-from pathlib import Path
-from typing import Any
+from __future__ import annotations
 
-import tomlkit
-from packaging.requirements import InvalidRequirement, Requirement
-from packaging.specifiers import SpecifierSet
-from packaging.version import Version
+import contextlib
+import tomllib
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+import upgrade_dependencies.tracing as tracing
 import upgrade_dependencies.utils as utils
-from upgrade_dependencies.dependency import Dependency, GitHubDependency, PyPIDependency
+from upgrade_dependencies.dependency import (
+    Dependency,
+    GitHubDependency,
+    PyPIDependency,
+    ReleaseInfo,
+    github_headers,
+)
+from upgrade_dependencies.github import create_pull_requests, fetch_latest_releases
+
+if TYPE_CHECKING:
+    import asyncio
+    from collections.abc import Callable, Coroutine, Sequence
+
+    import httpx
+    from packaging.requirements import Requirement
+
+    from upgrade_dependencies.cache import ResponseCache
+    from upgrade_dependencies.github import PullRequest
+    from upgrade_dependencies.retry import RetryPolicy
+    from upgrade_dependencies.snapshot import Snapshot
 
 
 class Project:
@@ -20,21 +39,111 @@ class Project:
     gh_pat: str | None
     dependencies: list[Dependency]
     project_path: str
-
+    limits: httpx.Limits | None
+    http2: bool
+    cache: ResponseCache | None
+    graphql: bool
+    timeout: float | None
+    retry: RetryPolicy | None
+    max_concurrency: int
+    snapshot: Snapshot | None
+    pypi_url: str | None
+    github_url: str | None
+    _by_name: dict[str, Dependency]
+    _pypi: list[PyPIDependency]
+    _github: list[GitHubDependency]
+    _base: list[PyPIDependency]
+    _optional: list[PyPIDependency]
+    _optional_grouped: dict[str, list[PyPIDependency]]
+    _group: list[PyPIDependency]
+    _group_grouped: dict[str, list[PyPIDependency]]
+    _github_actions: list[GitHubDependency]
+    _pre_commit: list[GitHubDependency]
+    _locations: dict[Dependency, list[utils.Location]]
+
+    @tracing.span("Project.__init__")
     def __init__(
         self,
         project_path: str = "",
         gh_pat: str | None = None,
+        limits: httpx.Limits | None = None,
+        http2: bool = True,
+        cache: ResponseCache | None = None,
+        graphql: bool = True,
+        timeout: float | None = None,
+        retry: RetryPolicy | None = None,
+        max_concurrency: int = 32,
+        snapshot: Snapshot | None = None,
+        pypi_url: str | None = None,
+        github_url: str | None = None,
+        scan: bool = True,
     ) -> None:
         """_summary_.
 
         Args:
             project_path: _description_
             gh_pat: _description_
+            limits: Connection pool limits for each host, ``DEFAULT_LIMITS`` if None.
+                Defaults to None.
+            http2: Whether to use HTTP/2 where supported. Defaults to True.
+            cache: On-disk response cache, if None all data is re-downloaded. Defaults
+                to None.
+            graphql: Whether to fetch GitHub releases in batches with the GraphQL
+                API, only used if ``gh_pat`` is provided. Defaults to True.
+            timeout: Timeout (in seconds) of each request attempt,
+                ``DEFAULT_TIMEOUT`` if None. Defaults to None.
+            retry: Retry policy for transient request failures, ``DEFAULT_RETRY`` if
+                None. Use ``RetryPolicy(max_retries=0)`` to disable retries. Defaults
+                to None.
+            max_concurrency: Maximum number of dependencies fetched at once, shared
+                by PyPI and GitHub fetches. Defaults to 32.
+            snapshot: If provided, all data is resolved from this snapshot without any
+                network I/O (offline mode). Defaults to None.
+            pypi_url: Base URL of the PyPI JSON API, ``PYPI_URL`` if None. Defaults to
+                None.
+            github_url: Base URL of the GitHub API, ``GITHUB_API_URL`` if None.
+                Defaults to None.
+            scan: Whether to scan the project files for dependencies. If False, the
+                project has no dependencies and ``project_path`` does not need a
+                pyproject.toml, only the data of other dependencies can be fetched.
+                Defaults to True.
         """
         # save project path
         self.project_path = project_path
 
+        # save http client settings
+        self.limits = limits
+        self.http2 = http2
+        self.cache = cache
+        self.graphql = graphql
+        self.timeout = timeout
+        self.retry = retry
+        self.max_concurrency = max_concurrency
+        self.snapshot = snapshot
+        self.pypi_url = pypi_url
+        self.github_url = github_url
+
+        # save GitHub PAT
+        self.gh_pat = gh_pat
+
+        # initialise dependencies and their indexes
+        self.dependencies = []
+        self._by_name = {}
+        self._pypi = []
+        self._github = []
+        self._base = []
+        self._optional = []
+        self._optional_grouped = {}
+        self._group = []
+        self._group_grouped = {}
+        self._github_actions = []
+        self._pre_commit = []
+        self._locations = {}
+
+        if not scan:
+            self.name = Path(project_path).resolve().name
+            return
+
         # check pyproject.toml exists
         ppt_file_path = Path(project_path) / "pyproject.toml"
 
@@ -42,25 +151,23 @@ class Project:
             msg = f"{ppt_file_path} does not exist."
             raise ValueError(msg)
 
-        # load pyproject.toml
-        with Path(ppt_file_path).open("r") as f:
-            ppt = tomlkit.load(fp=f).unwrap()
+        # load pyproject.toml, read-only so no need to preserve the formatting
+        with Path(ppt_file_path).open("rb") as f:
+            ppt = tomllib.load(f)
 
         # get project name
         self.name = ppt["project"]["name"]
 
-        # save GitHub PAT
-        self.gh_pat = gh_pat
-
-        # initialise dependencies
-        self.dependencies = []
-
         # get relevant paths
         workflows_dir = Path(project_path) / ".github" / "workflows"
         pre_commit_path = Path(project_path) / ".pre-commit-config.yaml"
 
         # save pypi dependencies
-        self.save_pypi_dependencies(ppt=ppt, workflows_dir=workflows_dir)
+        self.save_pypi_dependencies(
+            ppt=ppt,
+            workflows_dir=workflows_dir,
+            ppt_file_path=ppt_file_path,
+        )
 
         # save github dependencies
         self.save_github_dependencies(
@@ -68,33 +175,45 @@ class Project:
             pre_commit_path=pre_commit_path,
         )
 
+    @tracing.span("save_pypi_dependencies")
     def save_pypi_dependencies(
         self,
         ppt: dict[str, Any],
         workflows_dir: Path,
+        ppt_file_path: Path | None = None,
     ) -> None:
         """_summary_.
 
         Args:
             ppt: _description_
             workflows_dir: _description_
+            ppt_file_path: Path to pyproject.toml, used to record where each dependency
+                is specified. Defaults to None.
         """
-        # create list of pypi dependencies to add
-        pypi_dependencies: list[dict[str, Any]] = []
+        from packaging.specifiers import SpecifierSet
+
+        if ppt_file_path is None:
+            ppt_file_path = Path(self.project_path) / "pyproject.toml"
+
+        # create list of pypi dependencies to add, with the keys to their requirement
+        pypi_dependencies: list[tuple[dict[str, Any], tuple[str | int, ...]]] = []
 
         # base dependencies
-        for dep in ppt["project"]["dependencies"]:
+        for idx, dep in enumerate(ppt["project"]["dependencies"]):
             # parse requirement
             req = parse_requirement(requirement=dep)
             pypi_dependencies.append(
-                {
-                    "package_name": req.name,
-                    "specifier": req.specifier,
-                    "extras": list(req.extras),
-                    "base": True,
-                    "extra": None,
-                    "group": None,
-                },
+                (
+                    {
+                        "package_name": req.name,
+                        "specifier": req.specifier,
+                        "extras": list(req.extras),
+                        "base": True,
+                        "extra": None,
+                        "group": None,
+                    },
+                    ("project", "dependencies", idx),
+                ),
             )
 
         # optional dependencies
@@ -102,17 +221,20 @@ class Project:
 
         if opt_deps:
             for extra, deps in ppt["project"]["optional-dependencies"].items():
-                for dep in deps:
+                for idx, dep in enumerate(deps):
                     req = parse_requirement(requirement=dep)
                     pypi_dependencies.append(
-                        {
-                            "package_name": req.name,
-                            "specifier": req.specifier,
-                            "extras": list(req.extras),
-                            "base": False,
-                            "extra": extra,
-                            "group": None,
-                        },
+                        (
+                            {
+                                "package_name": req.name,
+                                "specifier": req.specifier,
+                                "extras": list(req.extras),
+                                "base": False,
+                                "extra": extra,
+                                "group": None,
+                            },
+                            ("project", "optional-dependencies", extra, idx),
+                        ),
                     )
 
         # dependency groups
@@ -120,41 +242,54 @@ class Project:
 
         if dep_groups:
             for group, deps in ppt["dependency-groups"].items():
-                for dep in deps:
+                for idx, dep in enumerate(deps):
                     req = parse_requirement(requirement=dep)
                     pypi_dependencies.append(
-                        {
-                            "package_name": req.name,
-                            "specifier": req.specifier,
-                            "extras": list(req.extras),
-                            "base": False,
-                            "extra": None,
-                            "group": group,
-                        },
+                        (
+                            {
+                                "package_name": req.name,
+                                "specifier": req.specifier,
+                                "extras": list(req.extras),
+                                "base": False,
+                                "extra": None,
+                                "group": group,
+                            },
+                            ("dependency-groups", group, idx),
+                        ),
                     )
 
         # add dependency objects
-        for pp_dep in pypi_dependencies:
-            self.dependencies.append(PyPIDependency(**pp_dep))
+        for pp_dep, keys in pypi_dependencies:
+            self.add_dependency(
+                dependency=PyPIDependency(**pp_dep),
+                locations=[utils.Location(file_path=ppt_file_path, keys=keys)],
+            )
 
         # uv version
         if workflows_dir.exists():
-            uv_version = utils.extract_from_yml_directory(
+            uv_version = utils.find_in_yml_directory(
                 gha_path=workflows_dir,
                 variable_name="UV_VERSION",
             )
 
             if len(uv_version) > 0:
-                self.dependencies.append(
-                    PyPIDependency(
+                self.add_dependency(
+                    dependency=PyPIDependency(
                         package_name="uv",
-                        specifier=SpecifierSet(f"=={uv_version[0]}"),
+                        specifier=SpecifierSet(f"=={uv_version[0][0]}"),
                         extras=[],
                         base=False,
                         group="uv",
                     ),
+                    # only the workflow level version is updated
+                    locations=[
+                        location
+                        for _, location in uv_version
+                        if location.keys == ("env", "UV_VERSION")
+                    ],
                 )
 
+    @tracing.span("save_github_dependencies")
     def save_github_dependencies(
         self,
         workflows_dir: Path,
@@ -169,13 +304,24 @@ class Project:
         Returns:
             _description_
         """
+        from packaging.specifiers import SpecifierSet
+        from packaging.version import Version
+
         # parse github actions
         if workflows_dir.exists():
-            github_actions = utils.extract_from_yml_directory(
+            found = utils.find_in_yml_directory(
                 gha_path=workflows_dir,
                 variable_name="uses",
             )
-            github_actions = list(set(github_actions))  # get unique set
+
+            github_actions = list(dict.fromkeys(gha for gha, _ in found))  # unique
+
+            # every use of an action is updated together, whatever its version
+            action_locations: dict[str, list[utils.Location]] = {}
+
+            for gha, location in found:
+                name = gha.split("@", maxsplit=1)[0]
+                action_locations.setdefault(name, []).append(location)
 
             # add github actions objects
             for gha in github_actions:
@@ -194,37 +340,104 @@ class Project:
 
                 v = Version(version)
 
-                self.dependencies.append(
-                    GitHubDependency(
+                self.add_dependency(
+                    dependency=GitHubDependency(
                         package_name=package_name,
                         specifier=SpecifierSet(f"~={v.major}.{v.minor}"),
                         action=True,
                         pre_commit=False,
                         full_version=full_version,
                     ),
+                    locations=action_locations[package_name],
                 )
 
         # parse pre-commit-config
         if pre_commit_path.exists():
-            pre_commit_repos = utils.parse_pre_commit_config(file_path=pre_commit_path)
+            pre_commit_repos = utils.find_pre_commit_repos(file_path=pre_commit_path)
 
-            for pc_repo in pre_commit_repos:
+            for pc_repo, location in pre_commit_repos:
                 url = pc_repo["repo"]
                 owner = url.split("/")[-2]
                 repo = url.split("/")[-1]
                 v = Version(pc_repo["rev"])
                 has_v = pc_repo["rev"][0] == "v"
 
-                self.dependencies.append(
-                    GitHubDependency(
+                self.add_dependency(
+                    dependency=GitHubDependency(
                         package_name=f"{owner}/{repo}",
                         specifier=SpecifierSet(f"=={v}"),
                         action=False,
                         pre_commit=True,
                         has_v=has_v,
                     ),
+                    locations=[location],
+                )
+
+    def add_dependency(
+        self,
+        dependency: Dependency,
+        locations: list[utils.Location] | None = None,
+    ) -> None:
+        """Registers a dependency, adding it to the name and category indexes.
+
+        Args:
+            dependency: Dependency to add
+            locations: Where the dependency is specified in the project, if known.
+                Defaults to None.
+        """
+        self.dependencies.append(dependency)
+
+        if locations is not None:
+            self._locations[dependency] = locations
+
+        # the first dependency registered under a name is found by get_dependency
+        self._by_name.setdefault(dependency.package_name, dependency)
+
+        if isinstance(dependency, PyPIDependency):
+            self._pypi.append(dependency)
+
+            if dependency.base:
+                self._base.append(dependency)
+
+            if dependency.extra:
+                self._optional.append(dependency)
+                self._optional_grouped.setdefault(dependency.extra, []).append(
+                    dependency,
+                )
+
+            if dependency.group:
+                self._group.append(dependency)
+                self._group_grouped.setdefault(dependency.group, []).append(
+                    dependency,
                 )
 
+        elif isinstance(dependency, GitHubDependency):
+            self._github.append(dependency)
+
+            if dependency.action:
+                self._github_actions.append(dependency)
+
+            if dependency.pre_commit:
+                self._pre_commit.append(dependency)
+
+    @property
+    def pypi_dependencies(self) -> list[PyPIDependency]:
+        """PyPI dependencies of the project.
+
+        Returns:
+            List of PyPI dependencies
+        """
+        return self._pypi
+
+    @property
+    def github_dependencies(self) -> list[GitHubDependency]:
+        """GitHub dependencies (actions and pre-commit hooks) of the project.
+
+        Returns:
+            List of GitHub dependencies
+        """
+        return self._github
+
     @property
     def base_dependencies(self) -> list[PyPIDependency]:
         """_summary_.
@@ -232,11 +445,7 @@ class Project:
         Returns:
             _description_
         """
-        return [
-            dep
-            for dep in self.dependencies
-            if isinstance(dep, PyPIDependency) and dep.base
-        ]
+        return self._base
 
     @property
     def optional_dependencies(self) -> list[PyPIDependency]:
@@ -245,11 +454,7 @@ class Project:
         Returns:
             _description_
         """
-        return [
-            dep
-            for dep in self.dependencies
-            if isinstance(dep, PyPIDependency) and dep.extra
-        ]
+        return self._optional
 
     @property
     def optional_dependencies_grouped(self) -> dict[str, list[PyPIDependency]]:
@@ -258,13 +463,7 @@ class Project:
         Returns:
             _description_
         """
-        grouped_deps: dict[str, list[PyPIDependency]] = {}
-
-        for opt_dep in self.optional_dependencies:
-            if isinstance(opt_dep.extra, str):
-                grouped_deps.setdefault(opt_dep.extra, []).append(opt_dep)
-
-        return grouped_deps
+        return self._optional_grouped
 
     @property
     def group_dependencies(self) -> list[PyPIDependency]:
@@ -273,11 +472,7 @@ class Project:
         Returns:
             _description_
         """
-        return [
-            dep
-            for dep in self.dependencies
-            if isinstance(dep, PyPIDependency) and dep.group
-        ]
+        return self._group
 
     @property
     def group_dependencies_grouped(self) -> dict[str, list[PyPIDependency]]:
@@ -286,13 +481,7 @@ class Project:
         Returns:
             _description_
         """
-        grouped_deps: dict[str, list[PyPIDependency]] = {}
-
-        for group_dep in self.group_dependencies:
-            if isinstance(group_dep.group, str):
-                grouped_deps.setdefault(group_dep.group, []).append(group_dep)
-
-        return grouped_deps
+        return self._group_grouped
 
     @property
     def github_actions_dependencies(self) -> list[GitHubDependency]:
@@ -301,11 +490,7 @@ class Project:
         Returns:
             _description_
         """
-        return [
-            dep
-            for dep in self.dependencies
-            if isinstance(dep, GitHubDependency) and dep.action
-        ]
+        return self._github_actions
 
     @property
     def pre_commit_dependencies(self) -> list[GitHubDependency]:
@@ -314,50 +499,319 @@ class Project:
         Returns:
             _description_
         """
-        return [
+        return self._pre_commit
+
+    @tracing.span("fetch_all_data")
+    def fetch_all_data(
+        self,
+        pypi: bool = True,
+        github: bool = True,
+        dependencies: Sequence[Dependency] | None = None,
+    ) -> None:
+        """Synchronously fetches all (PyPI and GitHub) data in a single event loop.
+
+        Args:
+            pypi: Whether to fetch PyPI data. Defaults to True.
+            github: Whether to fetch GitHub data. Defaults to True.
+            dependencies: Dependencies to fetch the data for, if None all the project
+                dependencies are fetched. Defaults to None.
+        """
+        import asyncio
+
+        if self.snapshot is not None:
+            self.load_snapshot_data(pypi=pypi, github=github, dependencies=dependencies)
+            return
+
+        asyncio.run(self.fetch_all(pypi=pypi, github=github, dependencies=dependencies))
+
+    async def fetch_all(
+        self,
+        pypi: bool = True,
+        github: bool = True,
+        dependencies: Sequence[Dependency] | None = None,
+    ) -> None:
+        """Fetches PyPI and GitHub data concurrently.
+
+        Both sources are scheduled at once and share a budget of ``max_concurrency``
+        in-flight dependency fetches, so the total time is that of the slowest source
+        rather than the sum of both.
+
+        Args:
+            pypi: Whether to fetch PyPI data. Defaults to True.
+            github: Whether to fetch GitHub data. Defaults to True.
+            dependencies: Dependencies to fetch the data for, if None all the project
+                dependencies are fetched. Defaults to None.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        fetches: list[Coroutine[Any, Any, None]] = []
+
+        if pypi:
+            fetches.append(
+                self.fetch_all_pypi_data(
+                    semaphore=semaphore,
+                    dependencies=dependencies,
+                ),
+            )
+
+        if github:
+            fetches.append(
+                self.fetch_all_github_data(
+                    semaphore=semaphore,
+                    dependencies=dependencies,
+                ),
+            )
+
+        await asyncio.gather(*fetches)
+
+    def load_snapshot_data(
+        self,
+        pypi: bool = True,
+        github: bool = True,
+        dependencies: Sequence[Dependency] | None = None,
+    ) -> None:
+        """Loads all (PyPI and GitHub) data from the snapshot, reporting missing data.
+
+        Args:
+            pypi: Whether to load PyPI data. Defaults to True.
+            github: Whether to load GitHub data. Defaults to True.
+            dependencies: Dependencies to load the data for, if None all the project
+                dependencies are loaded. Defaults to None.
+
+        Raises:
+            RuntimeError: If the project has no snapshot
+        """
+        if self.snapshot is None:
+            msg = "No snapshot to load data from."
+            raise RuntimeError(msg)
+
+        deps = [
             dep
-            for dep in self.dependencies
-            if isinstance(dep, GitHubDependency) and dep.pre_commit
+            for dep in (self.dependencies if dependencies is None else dependencies)
+            if (pypi and isinstance(dep, PyPIDependency))
+            or (github and isinstance(dep, GitHubDependency))
         ]
 
-    def fetch_all_data(self) -> None:
-        """Fetches all (PyPI and GitHub) data."""
-        self.pypi_dependency_data_async()
-        self.github_dependency_data_async()
+        for dep in self.snapshot.load_dependencies(dependencies=deps):
+            print(f"Failed to load data for {dep.package_name}: not in the snapshot")
+
+    def create_pypi_client(self) -> httpx.AsyncClient:
+        """Creates the pooled client shared by all PyPI requests.
+
+        The HTTP stack is only imported once a client is needed.
+
+        Returns:
+            PyPI client
+        """
+        from upgrade_dependencies.client import (
+            DEFAULT_LIMITS,
+            DEFAULT_RETRY,
+            DEFAULT_TIMEOUT,
+            PYPI_URL,
+            create_client,
+        )
+
+        return create_client(
+            base_url=self.pypi_url or PYPI_URL,
+            limits=self.limits or DEFAULT_LIMITS,
+            http2=self.http2,
+            timeout=DEFAULT_TIMEOUT if self.timeout is None else self.timeout,
+            retry=self.retry or DEFAULT_RETRY,
+        )
+
+    def create_github_client(self) -> httpx.AsyncClient:
+        """Creates the pooled client shared by all GitHub API requests.
+
+        Requests are throttled by a rate limiter shared by all requests of the client.
+
+        Returns:
+            GitHub API client
+        """
+        from upgrade_dependencies.client import (
+            DEFAULT_LIMITS,
+            DEFAULT_RETRY,
+            DEFAULT_TIMEOUT,
+            GITHUB_API_URL,
+            create_client,
+        )
+        from upgrade_dependencies.ratelimit import RateLimiter
+
+        return create_client(
+            base_url=self.github_url or GITHUB_API_URL,
+            limits=self.limits or DEFAULT_LIMITS,
+            http2=self.http2,
+            headers=github_headers(gh_pat=self.gh_pat),
+            rate_limiter=RateLimiter(),
+            timeout=DEFAULT_TIMEOUT if self.timeout is None else self.timeout,
+            retry=self.retry or DEFAULT_RETRY,
+        )
+
+    async def save_all_data(
+        self,
+        dependencies: Sequence[Dependency],
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore | None = None,
+    ) -> None:
+        """Fetches data for dependencies concurrently, reporting any failures.
+
+        Dependencies that refer to the same package or repository (e.g. the same
+        package in several extras) share a single request and result.
+
+        Args:
+            dependencies: Dependencies to fetch the data for
+            client: Pooled client to fetch the data with
+            semaphore: If provided, limits the number of concurrent fetches. Defaults
+                to None.
+        """
+        import asyncio
+
+        from upgrade_dependencies.client import SingleFlight
+
+        flight: SingleFlight[ReleaseInfo] = SingleFlight()
+
+        async def fetch(dep: Dependency) -> ReleaseInfo:
+            async with semaphore or contextlib.nullcontext():
+                return await dep.fetch_release(client=client, cache=self.cache)
+
+        async def save(dep: Dependency) -> None:
+            dep.release = await flight.do(key=dep.flight_key, fn=lambda: fetch(dep))
 
-    async def fetch_all_pypi_data(self) -> None:
-        """Fetches PyPI data for all Dependency objects concurrently."""
         results = await asyncio.gather(
-            *[
-                dep.save_data()
-                for dep in self.dependencies
-                if isinstance(dep, PyPIDependency)
-            ],
+            *[save(dep=dep) for dep in dependencies],
             return_exceptions=True,
         )
 
-        for dep, result in zip(self.dependencies, results, strict=False):
+        for dep, result in zip(dependencies, results, strict=True):
             if isinstance(result, Exception):
                 print(f"Failed to fetch data for {dep.package_name}: {result}")
 
+    async def fetch_all_pypi_data(
+        self,
+        semaphore: asyncio.Semaphore | None = None,
+        dependencies: Sequence[Dependency] | None = None,
+    ) -> None:
+        """Fetches PyPI data for all Dependency objects concurrently.
+
+        Args:
+            semaphore: If provided, limits the number of concurrent fetches. Defaults
+                to None.
+            dependencies: Dependencies to fetch the data for, if None all the project
+                dependencies are fetched. Defaults to None.
+        """
+        pypi_deps = (
+            self._pypi
+            if dependencies is None
+            else [dep for dep in dependencies if isinstance(dep, PyPIDependency)]
+        )
+
+        if len(pypi_deps) == 0:
+            return
+
+        async with self.create_pypi_client() as client:
+            await self.save_all_data(
+                dependencies=pypi_deps,
+                client=client,
+                semaphore=semaphore,
+            )
+
+        if self.cache is not None:
+            self.cache.evict()
+
     def pypi_dependency_data_async(self) -> None:
         """Synchronously fetches PyPI data for all Dependency objects."""
+        import asyncio
+
         asyncio.run(self.fetch_all_pypi_data())
 
-    async def fetch_all_github_data(self) -> None:
-        """Fetches GitHub data for all dependency objects concurrently."""
-        await asyncio.gather(
-            *[
-                dep.save_data(gh_pat=self.gh_pat)
-                for dep in self.dependencies
-                if isinstance(dep, GitHubDependency)
-            ],
+    async def fetch_all_github_data(
+        self,
+        semaphore: asyncio.Semaphore | None = None,
+        dependencies: Sequence[Dependency] | None = None,
+    ) -> None:
+        """Fetches GitHub data for all dependency objects concurrently.
+
+        With a GitHub PAT the GraphQL API is used to resolve the latest releases in
+        batches, otherwise one REST request is made per dependency.
+
+        Args:
+            semaphore: If provided, limits the number of concurrent REST fetches.
+                Defaults to None.
+            dependencies: Dependencies to fetch the data for, if None all the project
+                dependencies are fetched. Defaults to None.
+        """
+        github_deps = (
+            self._github
+            if dependencies is None
+            else [dep for dep in dependencies if isinstance(dep, GitHubDependency)]
         )
 
+        if len(github_deps) == 0:
+            return
+
+        async with self.create_github_client() as client:
+            if self.graphql and self.gh_pat is not None:
+                try:
+                    await fetch_latest_releases(
+                        client=client,
+                        dependencies=github_deps,
+                        cache=self.cache,
+                    )
+                except RuntimeError as e:
+                    print(f"Failed to fetch GitHub data: {e}")
+            else:
+                await self.save_all_data(
+                    dependencies=github_deps,
+                    client=client,
+                    semaphore=semaphore,
+                )
+
+        if self.cache is not None:
+            self.cache.evict()
+
     def github_dependency_data_async(self) -> None:
         """Synchronously fetches GitHub data for all dependency objects."""
+        import asyncio
+
         asyncio.run(self.fetch_all_github_data())
 
+    @tracing.span("create_pull_requests", category="http")
+    def create_pull_requests(
+        self,
+        owner: str,
+        repo: str,
+        pull_requests: list[PullRequest],
+    ) -> list[str | Exception]:
+        """Creates pull requests concurrently through the pooled GitHub client.
+
+        Args:
+            owner: Owner of the repository
+            repo: Name of the repository
+            pull_requests: Pull requests to create
+
+        Returns:
+            URL of each pull request, or the error if it could not be created
+
+        Raises:
+            ValueError: If no GitHub PAT was provided
+        """
+        import asyncio
+
+        if self.gh_pat is None:
+            msg = "A GitHub PAT is required to create pull requests."
+            raise ValueError(msg)
+
+        async def create() -> list[str | Exception]:
+            async with self.create_github_client() as client:
+                return await create_pull_requests(
+                    client=client,
+                    owner=owner,
+                    repo=repo,
+                    pull_requests=pull_requests,
+                )
+
+        return asyncio.run(create())
+
     def update_dependency(
         self,
         dependency: Dependency,
@@ -369,79 +823,275 @@ class Project:
             dependency: _description_
             version: _description_
         """
+        self.update_dependencies(updates=[(dependency, version)])
+
+    def update_dependencies(
+        self,
+        updates: Sequence[tuple[Dependency, str]],
+    ) -> list[Path]:
+        """Updates many dependencies, writing each affected file once.
+
+        The edits of all the dependencies are planned and applied in memory first, if
+        any of them fails nothing is written.
+
+        Args:
+            updates: Dependencies and the versions to update them to
+
+        Returns:
+            Paths of the files written
+        """
+        return utils.write_edits(edits=self.plan_updates(updates=updates))
+
+    def plan_updates(
+        self,
+        updates: Sequence[tuple[Dependency, str]],
+    ) -> dict[Path, utils.Edits]:
+        """Plans the edits that update many dependencies, without writing anything.
+
+        Args:
+            updates: Dependencies and the versions to update them to
+
+        Returns:
+            Edits by file
+
+        Raises:
+            RuntimeError: If two updates set the same value to different versions
+        """
+        edits: dict[Path, utils.Edits] = {}
+        ppt: dict[str, Any] | None = None
+
+        for dependency, version in updates:
+            # pyproject.toml is parsed once for all the PyPI dependencies
+            if ppt is None and isinstance(dependency, PyPIDependency):
+                with (Path(self.project_path) / "pyproject.toml").open("rb") as f:
+                    ppt = tomllib.load(f)
+
+            for location, new_value in self.plan_update(
+                dependency=dependency,
+                version=version,
+                ppt=ppt,
+            ):
+                file_edits = edits.setdefault(location.file_path, {})
+
+                if file_edits.setdefault(location.keys, new_value) != new_value:
+                    msg = f"Conflicting updates of {dependency}."
+                    raise RuntimeError(msg)
+
+        return edits
+
+    def plan_update(
+        self,
+        dependency: Dependency,
+        version: str,
+        ppt: dict[str, Any] | None = None,
+    ) -> list[tuple[utils.Location, str]]:
+        """Plans the edits that update a dependency, without writing anything.
+
+        Args:
+            dependency: Dependency to update
+            version: Version to update to
+            ppt: Parsed pyproject.toml, read from the file if None. Defaults to None.
+
+        Returns:
+            Locations to edit and their new values
+
+        Raises:
+            RuntimeError: If the dependency cannot be found in the project
+        """
+        from packaging.version import Version
+
+        workflows_dir = Path(self.project_path) / ".github" / "workflows"
+        pre_commit_path = Path(self.project_path) / ".pre-commit-config.yaml"
+        name = dependency.package_name
+
         # update pypi dependencies
         if isinstance(dependency, PyPIDependency):
+            if name != "uv":
+                return [
+                    self.plan_pyproject_update(
+                        dependency=dependency,
+                        version=version,
+                        ppt=ppt,
+                    ),
+                ]
+
             # handle special case uv, lives in github actions
-            if dependency.package_name == "uv":
-                workflows_dir = Path(self.project_path) / ".github" / "workflows"
-                utils.update_uv(workflows_dir, version)
-            else:
-                # load pyproject.toml
-                ppt_file_path = Path(self.project_path) / "pyproject.toml"
-
-                with Path(ppt_file_path).open("r") as f:
-                    ppt = tomlkit.load(fp=f)
-
-                # find reference to dependency in the file and update the version
-                if dependency.base:
-                    deps: list[str] = ppt["project"]["dependencies"]  # pyright: ignore
-                elif isinstance(dependency.extra, str):
-                    deps: list[str] = ppt["project"]["optional-dependencies"][  # pyright: ignore
-                        dependency.extra
+            new_value = version
+            locations = self.find_locations(
+                dependency=dependency,
+                matches=lambda parent, key: isinstance(parent[key], str),
+                search=lambda: [
+                    location
+                    for _, location in utils.find_in_yml_directory(
+                        gha_path=workflows_dir,
+                        variable_name="UV_VERSION",
+                    )
+                    if location.keys == ("env", "UV_VERSION")
+                ],
+            )
+        # github dependencies
+        elif isinstance(dependency, GitHubDependency) and dependency.action:
+            # get major version release
+            v = Version(version)
+            new_value = utils.build_action_requirement(
+                dependency=dependency,
+                new_version=str(v.major),
+            )
+            locations = self.find_locations(
+                dependency=dependency,
+                matches=lambda parent, key: (
+                    isinstance(parent[key], str)
+                    and parent[key].split("@", maxsplit=1)[0] == name
+                ),
+                search=lambda: [
+                    location
+                    for value, location in utils.find_in_yml_directory(
+                        gha_path=workflows_dir,
+                        variable_name="uses",
+                    )
+                    if value.split("@", maxsplit=1)[0] == name
+                ],
+            )
+        elif isinstance(dependency, GitHubDependency) and dependency.pre_commit:
+            # ensure x.x.x for version
+            v = Version(version)
+            v_str = "v" if dependency.has_v else ""
+            new_value = f"{v_str}{v.major}.{v.minor}.{v.micro}"
+            url = f"https://github.com/{dependency.owner}/{dependency.repo}"
+            locations = self.find_locations(
+                dependency=dependency,
+                matches=lambda parent, _: parent.get("repo") == url,
+                search=lambda: (
+                    [
+                        location
+                        for info, location in utils.find_pre_commit_repos(
+                            file_path=pre_commit_path,
+                        )
+                        if info["repo"] == url
                     ]
-                elif isinstance(dependency.group, str):
-                    deps: list[str] = ppt["dependency-groups"][dependency.group]  # pyright: ignore
-                else:
-                    msg = "Unknown dependency type."
-                    raise RuntimeError(msg)
+                    if pre_commit_path.exists()
+                    else []
+                ),
+            )
+        else:
+            msg = "Unknown dependency type."
+            raise RuntimeError(msg)
 
-                for idx, dep in enumerate(deps):
-                    req = parse_requirement(requirement=dep)
+        if len(locations) == 0:
+            msg = f"Cannot find {dependency}!"
+            raise RuntimeError(msg)
 
-                    if req.name == dependency.package_name:
-                        # build new requirement
-                        new_req = build_new_requirement(
-                            old_requirement=req,
-                            new_version=version,
-                        )
-                        deps[idx] = new_req
-                        break
-                else:
-                    msg = f"Cannot find {dependency}!"
-                    raise RuntimeError(msg)
+        return [(location, new_value) for location in locations]
 
-                # write new pyproject.toml file
-                # temp_ppt = ppt_file_path.with_suffix(".temp")
-                with Path(ppt_file_path).open("w") as temp_f:
-                    tomlkit.dump(data=ppt, fp=temp_f)  # pyright: ignore
-        # github dependencies
-        elif isinstance(dependency, GitHubDependency):
-            if dependency.action:
-                # get workflows directory
-                workflows_dir = Path(self.project_path) / ".github" / "workflows"
+    def plan_pyproject_update(
+        self,
+        dependency: PyPIDependency,
+        version: str,
+        ppt: dict[str, Any] | None = None,
+    ) -> tuple[utils.Location, str]:
+        """Plans the edit of pyproject.toml that updates a PyPI dependency.
 
-                # get major version release
-                v = Version(version)
+        Args:
+            dependency: Dependency to update
+            version: Version to update to
+            ppt: Parsed pyproject.toml, read from the file if None. Defaults to None.
 
-                # update dependency
-                utils.update_github_workflows(
-                    gha_path=workflows_dir,
-                    dependency=dependency,
-                    new_version=str(v.major),
-                )
-            elif dependency.pre_commit:
-                # get pre-commit path
-                pre_commit_path = Path(self.project_path) / ".pre-commit-config.yaml"
+        Returns:
+            Location of the requirement and the new requirement
 
-                # ensure x.x.x for version
-                v = Version(version)
+        Raises:
+            RuntimeError: If the dependency cannot be found in pyproject.toml
+        """
+        # load pyproject.toml
+        ppt_file_path = Path(self.project_path) / "pyproject.toml"
+
+        if ppt is None:
+            with Path(ppt_file_path).open("rb") as f:
+                ppt = tomllib.load(f)
+
+        # find reference to dependency in the file, starting where it was when the
+        # project was scanned
+        locations = self.get_locations(dependency=dependency)
+        start = 0
+
+        if locations:
+            deps_keys = locations[0].keys[:-1]
+            start = int(locations[0].keys[-1])
+        elif dependency.base:
+            deps_keys = ("project", "dependencies")
+        elif isinstance(dependency.extra, str):
+            deps_keys = ("project", "optional-dependencies", dependency.extra)
+        elif isinstance(dependency.group, str):
+            deps_keys = ("dependency-groups", dependency.group)
+        else:
+            msg = "Unknown dependency type."
+            raise RuntimeError(msg)
+
+        deps: list[str] = utils.get_by_keys(data=ppt, keys=deps_keys)
+
+        for idx in chain([start], range(len(deps))):
+            if idx >= len(deps):
+                continue
+
+            req = parse_requirement(requirement=deps[idx])
 
-                # update dependency
-                utils.update_pre_commit(
-                    file_path=pre_commit_path,
-                    dependency=dependency,
-                    new_version=f"{v.major}.{v.minor}.{v.micro}",
+            if req.name == dependency.package_name:
+                # build new requirement
+                new_req = build_new_requirement(
+                    old_requirement=req,
+                    new_version=version,
                 )
+                location = utils.Location(
+                    file_path=ppt_file_path,
+                    keys=(*deps_keys, idx),
+                )
+
+                return location, new_req
+
+        msg = f"Cannot find {dependency}!"
+        raise RuntimeError(msg)
+
+    def find_locations(
+        self,
+        dependency: Dependency,
+        matches: Callable[[Any, str | int], bool],
+        search: Callable[[], list[utils.Location]],
+    ) -> list[utils.Location]:
+        """Finds where a dependency is specified in the project.
+
+        Args:
+            dependency: Dependency
+            matches: Checks whether a location still holds the dependency, given the
+                parent mapping (or list) and the key of the value
+            search: Searches the project files for the dependency
+
+        Returns:
+            Locations recorded when the project was scanned, or found by ``search``
+            if any of them is stale
+        """
+        locations = self.get_locations(dependency=dependency)
+
+        if locations and all(
+            utils.location_matches(location=location, matches=matches)
+            for location in locations
+        ):
+            return locations
+
+        return search()
+
+    def get_locations(
+        self,
+        dependency: Dependency,
+    ) -> list[utils.Location] | None:
+        """Gets where a dependency is specified in the project.
+
+        Args:
+            dependency: Dependency
+
+        Returns:
+            Locations recorded when the project was scanned, None if not known
+        """
+        return self._locations.get(dependency)
 
     def get_dependency(
         self,
@@ -455,13 +1105,63 @@ class Project:
         Returns:
             _description_
         """
-        for dependency in self.dependencies:
-            if dependency.package_name == name:
-                return dependency
-        else:
-            msg = "Cannot find {name} in the package!"
+        dependency = self._by_name.get(name)
+
+        if dependency is None:
+            msg = f"Cannot find {name} in the package!"
             raise RuntimeError(msg)
 
+        return dependency
+
+    def match_dependencies(
+        self,
+        other: Project,
+        dependencies: Sequence[Dependency],
+    ) -> list[Dependency]:
+        """Finds the dependencies corresponding to those of another scan of the project.
+
+        The other scan is typically of another revision of the project. Dependencies
+        correspond if they have the same name and category (e.g. the
+        same optional dependency group), and the same position among the dependencies
+        sharing both.
+
+        Args:
+            other: Other scan of the project
+            dependencies: Dependencies of ``other``
+
+        Returns:
+            Corresponding dependencies of this project, in the same order
+
+        Raises:
+            RuntimeError: If a dependency has no counterpart in this project
+        """
+        own: dict[tuple[Any, ...], list[Dependency]] = {}
+        positions: dict[Dependency, int] = {}
+        seen: dict[tuple[Any, ...], int] = {}
+
+        for dependency in self.dependencies:
+            key = get_dependency_key(dependency=dependency)
+            own.setdefault(key, []).append(dependency)
+
+        for dependency in other.dependencies:
+            key = get_dependency_key(dependency=dependency)
+            positions[dependency] = seen.get(key, 0)
+            seen[key] = positions[dependency] + 1
+
+        matched: list[Dependency] = []
+
+        for dependency in dependencies:
+            candidates = own.get(get_dependency_key(dependency=dependency), [])
+            position = positions.get(dependency, 0)
+
+            if position >= len(candidates):
+                msg = f"Cannot find {dependency.package_name} in {self.name}."
+                raise RuntimeError(msg)
+
+            matched.append(candidates[position])
+
+        return matched
+
     def __repr__(self) -> str:
         """_summary_.
 
@@ -471,6 +1171,35 @@ class Project:
         return self.name
 
 
+def get_dependency_key(dependency: Dependency) -> tuple[Any, ...]:
+    """Gets the name and category of a dependency.
+
+    Args:
+        dependency: Dependency
+
+    Returns:
+        Key identifying the dependency within a project, up to duplicates
+    """
+    if isinstance(dependency, PyPIDependency):
+        return (
+            "pypi",
+            dependency.package_name,
+            dependency.base,
+            dependency.extra,
+            dependency.group,
+        )
+
+    if isinstance(dependency, GitHubDependency):
+        return (
+            "github",
+            dependency.package_name,
+            dependency.action,
+            dependency.pre_commit,
+        )
+
+    return ("other", dependency.package_name)
+
+
 def parse_requirement(requirement: str) -> Requirement:
     """_summary_.
 
@@ -480,6 +1209,8 @@ def parse_requirement(requirement: str) -> Requirement:
     Returns:
         _description_
     """
+    from packaging.requirements import InvalidRequirement, Requirement
+
     try:
         req = Requirement(requirement)
     except InvalidRequirement as e:
@@ -0,0 +1,289 @@
+"""Rate-limit-aware request scheduling for the GitHub API."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import httpx
+
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_RESERVE = 1
+DEFAULT_MAX_WAIT = 60.0  # seconds
+DEFAULT_RESOURCE = "core"
+
+
+def get_resource(request: httpx.Request) -> str:
+    """Gets the rate limit resource (i.e. budget) a GitHub API request counts against.
+
+    Args:
+        request: Request
+
+    Returns:
+        ``graphql`` for GraphQL requests, otherwise ``core`` (the REST API)
+    """
+    return "graphql" if request.url.path.endswith("/graphql") else DEFAULT_RESOURCE
+
+
+@dataclass
+class ResourceState:
+    """Rate limit state of a GitHub API resource.
+
+    Attributes:
+        remaining: Requests left in the current window, None if not known yet
+        reset: Unix time the current window ends, None if not known yet
+        blocked_until: Unix time before which no request is sent
+        in_flight: Number of requests sent and not answered yet
+    """
+
+    remaining: int | None = None
+    reset: float | None = None
+    blocked_until: float = 0.0
+    in_flight: int = 0
+
+
+class RateLimiter:
+    """Tracks the GitHub rate limit across all in-flight requests and throttles them.
+
+    GitHub keeps a separate budget for each resource (e.g. ``core`` for the REST API
+    and ``graphql``), named by the ``x-ratelimit-resource`` header, so the state is
+    tracked per resource. The ``x-ratelimit-remaining`` and ``x-ratelimit-reset``
+    headers of every response are recorded. New requests wait for the reset once the
+    remaining budget of their resource (less the requests already in flight) reaches
+    ``reserve``, and wait for ``retry-after`` after a secondary rate limit. At most
+    ``max_concurrency`` requests (of all resources) are in flight at once to avoid
+    triggering secondary rate limits in large batches.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        reserve: int = DEFAULT_RESERVE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ) -> None:
+        """Inits the RateLimiter class.
+
+        Args:
+            max_concurrency: Maximum number of requests in flight. Defaults to
+                ``DEFAULT_MAX_CONCURRENCY``.
+            reserve: Number of requests of the budget to leave unused. Defaults to
+                ``DEFAULT_RESERVE``.
+            max_wait: Maximum time (in seconds) to wait for the rate limit to reset, if
+                the reset is further away requests fail instead. Defaults to
+                ``DEFAULT_MAX_WAIT``.
+        """
+        self.max_concurrency = max_concurrency
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.resources: dict[str, ResourceState] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def get_state(
+        self,
+        resource: str = DEFAULT_RESOURCE,
+    ) -> ResourceState:
+        """Gets the rate limit state of a resource.
+
+        Args:
+            resource: Rate limit resource. Defaults to ``DEFAULT_RESOURCE``.
+
+        Returns:
+            State of the resource, created if needed
+        """
+        return self.resources.setdefault(resource, ResourceState())
+
+    def get_wait(
+        self,
+        resource: str = DEFAULT_RESOURCE,
+    ) -> float:
+        """Gets the time to wait before another request can be sent.
+
+        Args:
+            resource: Rate limit resource of the request. Defaults to
+                ``DEFAULT_RESOURCE``.
+
+        Returns:
+            Wait time in seconds, 0 if a request can be sent now
+        """
+        state = self.get_state(resource=resource)
+        now = time.time()
+
+        if state.blocked_until > now:
+            return state.blocked_until - now
+
+        if (
+            state.remaining is not None
+            and state.reset is not None
+            and state.reset > now
+            and state.remaining - state.in_flight <= self.reserve
+        ):
+            return state.reset - now
+
+        return 0.0
+
+    async def acquire(
+        self,
+        resource: str = DEFAULT_RESOURCE,
+    ) -> bool:
+        """Waits until a request can be sent within the rate limit.
+
+        Args:
+            resource: Rate limit resource of the request. Defaults to
+                ``DEFAULT_RESOURCE``.
+
+        Returns:
+            False if the request would have to wait longer than ``max_wait``, in which
+            case no slot is acquired
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        await self._semaphore.acquire()
+
+        while (wait := self.get_wait(resource=resource)) > 0:
+            if wait > self.max_wait:
+                self._semaphore.release()
+                return False
+
+            await asyncio.sleep(wait)
+
+        self.get_state(resource=resource).in_flight += 1
+
+        return True
+
+    def release(
+        self,
+        response: httpx.Response | None,
+        resource: str = DEFAULT_RESOURCE,
+    ) -> float | None:
+        """Releases a request slot and records the rate limit state of its response.
+
+        Args:
+            response: Response to the request, None if the request failed
+            resource: Rate limit resource the slot was acquired for, the state is
+                recorded for the resource named by the response if any. Defaults to
+                ``DEFAULT_RESOURCE``.
+
+        Returns:
+            Time (in seconds) to wait before retrying if the request was rate limited,
+            otherwise None
+        """
+        self.get_state(resource=resource).in_flight -= 1
+
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+        if response is None:
+            return None
+
+        state = self.get_state(
+            resource=response.headers.get("x-ratelimit-resource", resource),
+        )
+        remaining = response.headers.get("x-ratelimit-remaining")
+        reset = response.headers.get("x-ratelimit-reset")
+
+        if remaining is not None and reset is not None:
+            if state.reset is not None and float(reset) == state.reset:
+                # same window, responses may arrive out of order
+                state.remaining = (
+                    int(remaining)
+                    if state.remaining is None
+                    else min(int(remaining), state.remaining)
+                )
+            else:
+                state.remaining = int(remaining)
+                state.reset = float(reset)
+
+        if response.status_code not in [403, 429]:
+            return None
+
+        retry_after = response.headers.get("retry-after")
+
+        if retry_after is not None:  # secondary rate limit
+            state.blocked_until = max(
+                state.blocked_until,
+                time.time() + float(retry_after),
+            )
+        elif state.remaining == 0 and state.reset is not None:  # primary rate limit
+            state.blocked_until = max(state.blocked_until, state.reset + 1)
+        else:
+            return None  # forbidden for another reason
+
+        return state.blocked_until - time.time()
+
+
+class RateLimitTransport(httpx.AsyncBaseTransport):
+    """Transport that schedules requests through a ``RateLimiter``.
+
+    Requests that are rate limited are retried once the limit allows. If the wait
+    exceeds the limiter's ``max_wait`` the rate limited response is returned, or an
+    error is raised without sending the request if the limit is already known to be
+    exhausted.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        limiter: RateLimiter,
+        max_retries: int = 3,
+    ) -> None:
+        """Inits the RateLimitTransport class.
+
+        Args:
+            transport: Transport used to send the requests
+            limiter: Rate limiter
+            max_retries: Maximum number of retries of a rate limited request. Defaults
+                to 3.
+        """
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        """Sends a request once the rate limit allows.
+
+        Args:
+            request: Request
+
+        Returns:
+            Response
+
+        Raises:
+            RuntimeError: If the rate limit is exhausted for longer than ``max_wait``
+        """
+        resource = get_resource(request=request)
+        attempt = 0
+
+        while True:
+            if not await self.limiter.acquire(resource=resource):
+                reset_time = datetime.fromtimestamp(
+                    time.time() + self.limiter.get_wait(resource=resource),
+                    UTC,
+                )
+                msg = f"Rate limit exceeded. Rate limit reset at {reset_time}."
+                raise RuntimeError(msg)
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except BaseException:
+                self.limiter.release(response=None, resource=resource)
+                raise
+
+            wait = self.limiter.release(response=response, resource=resource)
+
+            if (
+                wait is None
+                or attempt >= self.max_retries
+                or wait > self.limiter.max_wait
+            ):
+                return response
+
+            await response.aclose()
+            attempt += 1
+
+    async def aclose(self) -> None:
+        """Closes the underlying transport."""
+        await self.transport.aclose()
@@ -0,0 +1,195 @@
+"""Retries with backoff and a per-host circuit breaker for metadata fetches."""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Settings for retrying failed requests.
+
+    Attributes:
+        max_retries: Maximum number of retries of a request
+        backoff_factor: Base delay (in seconds), doubled after every attempt
+        max_backoff: Maximum delay (in seconds) between attempts
+        jitter: Whether to randomise the delay ("full jitter")
+        retry_statuses: Response status codes that are retried
+    """
+
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    max_backoff: float = 10.0
+    jitter: bool = True
+    retry_statuses: frozenset[int] = field(
+        default_factory=lambda: frozenset([500, 502, 503, 504]),
+    )
+
+    def get_backoff(self, attempt: int) -> float:
+        """Gets the delay before the next attempt.
+
+        Args:
+            attempt: Number of the failed attempt, starting at 0
+
+        Returns:
+            Delay in seconds
+        """
+        backoff = min(self.max_backoff, self.backoff_factor * 2**attempt)
+
+        return random.uniform(0, backoff) if self.jitter else backoff  # noqa: S311
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a request is not sent because the host's circuit is open."""
+
+
+class CircuitBreaker:
+    """Fails requests to a degraded host fast instead of letting them stall.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and requests
+    fail immediately for ``recovery_time`` seconds. After that a single trial request
+    is let through, closing the circuit again if it succeeds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+    ) -> None:
+        """Inits the CircuitBreaker class.
+
+        Args:
+            failure_threshold: Number of consecutive failures that open the circuit.
+                Defaults to 5.
+            recovery_time: Time (in seconds) the circuit stays open. Defaults to 30.0.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+
+    def check(
+        self,
+        host: str,
+    ) -> bool:
+        """Checks whether a request may be sent.
+
+        Args:
+            host: Host the request is sent to, used in the error message
+
+        Returns:
+            Whether the request is the trial request of a half-open circuit, which
+            must be ended with ``end_trial`` once it completes
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if self.opened_at is None:
+            return False
+
+        if time.monotonic() - self.opened_at >= self.recovery_time and (
+            not self.trial_in_flight
+        ):
+            self.trial_in_flight = True  # half-open, let a single request through
+            return True
+
+        msg = f"{host} is unavailable after {self.failures} consecutive failures."
+        raise CircuitOpenError(msg)
+
+    def record_success(self) -> None:
+        """Records a successful request, closing the circuit."""
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Records a failed request, opening the circuit beyond the threshold."""
+        self.failures += 1
+
+        if self.trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def end_trial(self) -> None:
+        """Ends the trial request, however it completed.
+
+        A trial that was neither recorded as a success nor a failure (e.g. it was
+        cancelled or raised an unexpected error) lets the next request through as a
+        new trial, instead of keeping the circuit half-open forever.
+        """
+        self.trial_in_flight = False
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """Transport that retries transient failures with exponential backoff.
+
+    Connection errors, timeouts and the policy's retry statuses are retried. Every
+    attempt goes through the host's circuit breaker.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        policy: RetryPolicy,
+        breaker: CircuitBreaker,
+    ) -> None:
+        """Inits the RetryTransport class.
+
+        Args:
+            transport: Transport used to send the requests
+            policy: Retry policy
+            breaker: Circuit breaker of the host
+        """
+        self.transport = transport
+        self.policy = policy
+        self.breaker = breaker
+
+    async def handle_async_request(
+        self,
+        request: httpx.Request,
+    ) -> httpx.Response:
+        """Sends a request, retrying transient failures.
+
+        Args:
+            request: Request
+
+        Returns:
+            Response, which may still have a retry status if all attempts failed
+        """
+        attempt = 0
+
+        while True:
+            trial = self.breaker.check(host=request.url.host)
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                self.breaker.record_failure()
+
+                if attempt >= self.policy.max_retries:
+                    raise
+            else:
+                if response.status_code not in self.policy.retry_statuses:
+                    self.breaker.record_success()
+                    return response
+
+                self.breaker.record_failure()
+
+                if attempt >= self.policy.max_retries:
+                    return response
+
+                await response.aclose()
+            finally:
+                if trial:
+                    self.breaker.end_trial()
+
+            await asyncio.sleep(self.policy.get_backoff(attempt=attempt))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        """Closes the underlying transport."""
+        await self.transport.aclose()
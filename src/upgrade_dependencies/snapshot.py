@@ -0,0 +1,175 @@
+"""Local snapshot index of latest release metadata for offline use."""
+
+import sqlite3
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from upgrade_dependencies.dependency import Dependency, ReleaseInfo
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    released TEXT,
+    yanked INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class Snapshot:
+    """SQLite index of the latest release of PyPI packages and GitHub repositories.
+
+    Releases are keyed on ``Dependency.flight_key``, i.e. ``pypi:<name>`` and
+    ``github:<owner>/<repo>``. Writing to an existing snapshot updates it in place, so
+    a single snapshot can be shared by many projects.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        readonly: bool = False,
+    ) -> None:
+        """Inits the Snapshot class.
+
+        Args:
+            path: Path to the SQLite database
+            readonly: Whether to open the snapshot read-only. Defaults to False.
+
+        Raises:
+            ValueError: If ``readonly`` and the snapshot does not exist
+        """
+        self.path = path
+
+        if readonly:
+            if not path.exists():
+                msg = f"{path} does not exist, run the snapshot command first."
+                raise ValueError(msg)
+
+            self.connection = sqlite3.connect(
+                f"{path.resolve().as_uri()}?mode=ro",
+                uri=True,
+            )
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(path)
+            self.connection.execute(SCHEMA)
+
+    def get(
+        self,
+        key: str,
+    ) -> ReleaseInfo | None:
+        """Gets the latest release for a key.
+
+        Args:
+            key: Release key
+
+        Returns:
+            Latest release facts, None if the key is not in the snapshot
+        """
+        row = self.connection.execute(
+            "SELECT version, released, yanked FROM releases WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return ReleaseInfo.from_dict(
+            data={"version": row[0], "released": row[1], "yanked": bool(row[2])},
+        )
+
+    def put_many(
+        self,
+        releases: dict[str, ReleaseInfo],
+    ) -> None:
+        """Adds (or updates) releases in the snapshot.
+
+        Args:
+            releases: Latest release facts by key
+        """
+        now = time.time()
+        rows = [
+            (key, *release.to_dict().values(), now) for key, release in releases.items()
+        ]
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def save_dependencies(
+        self,
+        dependencies: Sequence[Dependency],
+    ) -> int:
+        """Adds the fetched latest releases of dependencies to the snapshot.
+
+        Args:
+            dependencies: Dependencies, those without release data are skipped
+
+        Returns:
+            Number of releases added
+        """
+        releases = {
+            dep.flight_key: dep.release
+            for dep in dependencies
+            if dep.release is not None
+        }
+        self.put_many(releases=releases)
+
+        return len(releases)
+
+    def load_dependencies(
+        self,
+        dependencies: Sequence[Dependency],
+    ) -> list[Dependency]:
+        """Sets the latest release of dependencies from the snapshot.
+
+        Args:
+            dependencies: Dependencies to load the latest release for
+
+        Returns:
+            Dependencies that are not in the snapshot
+        """
+        missing: list[Dependency] = []
+
+        for dep in dependencies:
+            release = self.get(key=dep.flight_key)
+
+            if release is None:
+                missing.append(dep)
+            else:
+                dep.release = release
+
+        return missing
+
+    def close(self) -> None:
+        """Closes the snapshot."""
+        self.connection.close()
+
+    def __enter__(self) -> Self:
+        """Enters the context manager.
+
+        Returns:
+            Snapshot
+        """
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Closes the snapshot on exit.
+
+        Args:
+            exc_type: Exception type
+            exc_value: Exception
+            traceback: Traceback
+        """
+        self.close()
@@ -0,0 +1,99 @@
+"""Timing spans of the phases of a run, exported in the Chrome trace-event format.
+
+Tracing is disabled unless ``enable`` is called, spans then cost a single check. The
+trace can be opened in ``chrome://tracing`` or https://ui.perfetto.dev.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+# recorded trace events, and when recording started
+events: list[dict[str, Any]] = []
+state: dict[str, Any] = {"enabled": False, "start_ns": 0}
+span_ids = itertools.count(1)
+
+
+def enable() -> None:
+    """Starts recording spans, discarding any recorded before."""
+    events.clear()
+    state["enabled"] = True
+    state["start_ns"] = time.perf_counter_ns()
+
+
+def timestamp() -> float:
+    """Gets the time since tracing was enabled.
+
+    Returns:
+        Time in microseconds
+    """
+    return (time.perf_counter_ns() - state["start_ns"]) / 1000
+
+
+@contextmanager
+def span(
+    name: str,
+    category: str = "project",
+    asynchronous: bool = False,
+    **args: Any,
+) -> Generator[None]:
+    """Records the duration of a block, also usable as a decorator.
+
+    Synchronous spans nest per thread. Spans of concurrent asyncio tasks overlap on a
+    single thread, so they are recorded as async events, shown on their own tracks.
+
+    Args:
+        name: Name of the span
+        category: Category of the span. Defaults to "project".
+        asynchronous: Whether the span runs concurrently with others on the same
+            thread, e.g. in an asyncio task. Defaults to False.
+        **args: Details shown with the span, e.g. the package name
+    """
+    if not state["enabled"]:
+        yield
+        return
+
+    event: dict[str, Any] = {
+        "name": name,
+        "cat": category,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": args,
+    }
+    begin = timestamp()
+
+    if asynchronous:
+        event["id"] = next(span_ids)
+        events.append(event | {"ph": "b", "ts": begin})
+
+    try:
+        yield
+    finally:
+        end = timestamp()
+
+        if asynchronous:
+            events.append(event | {"ph": "e", "ts": end, "args": {}})
+        else:
+            events.append(event | {"ph": "X", "ts": begin, "dur": end - begin})
+
+
+def write(file_path: Path) -> None:
+    """Writes the recorded spans to a Chrome trace-event file.
+
+    Args:
+        file_path: Path to the trace file
+    """
+    data = {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    with file_path.open("w") as f:
+        json.dump(data, f)
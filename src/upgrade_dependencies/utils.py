@@ -1,40 +1,528 @@
 """Upgrade dependencies utilities module."""
 
+from __future__ import annotations
+
 import glob
+import io
 import os
 import subprocess
+import tempfile
+import tomllib
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from ruamel.yaml import YAML
+import upgrade_dependencies.tracing as tracing
 
-from upgrade_dependencies.dependency import GitHubDependency
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
 
-yaml = YAML()
+    from ruamel.yaml import YAML
+    from ruamel.yaml.nodes import Node, ScalarNode
 
+    from upgrade_dependencies.dependency import GitHubDependency
 
-def extract_variable_from_file(
-    file_path: str,
+# parsed YAML documents by (path, safe), with the (mtime, size) of the file
+yml_cache: dict[tuple[Path, bool], tuple[tuple[int, int], Any]] = {}
+
+
+@cache
+def get_yaml() -> YAML:
+    """Gets the shared round-trip YAML instance, importing ruamel on first use.
+
+    Returns:
+        Round-trip YAML instance
+    """
+    from ruamel.yaml import YAML
+
+    return YAML()
+
+
+@cache
+def get_safe_yaml() -> YAML:
+    """Gets the shared safe YAML instance, importing ruamel on first use.
+
+    Returns:
+        Safe YAML instance, using the C parser when available
+    """
+    from ruamel.yaml import YAML
+
+    return YAML(typ="safe", pure=False)
+
+
+@dataclass(frozen=True)
+class Location:
+    """Where a dependency is specified.
+
+    Attributes:
+        file_path: Path to the YAML or TOML file
+        keys: Mapping keys and list indexes leading from the document root to the
+            value, e.g. ``("jobs", "test", "steps", 0, "uses")``
+    """
+
+    file_path: Path
+    keys: tuple[str | int, ...]
+
+
+def get_by_keys(
+    data: Any,
+    keys: Sequence[str | int],
+) -> Any:
+    """Gets a value from nested mappings and lists.
+
+    Args:
+        data: Document
+        keys: Mapping keys and list indexes leading to the value
+
+    Returns:
+        Value
+    """
+    for key in keys:
+        data = data[key]
+
+    return data
+
+
+def write_atomic(
+    file_path: Path,
+    text: str,
+) -> None:
+    """Writes a file via a temporary file that replaces it.
+
+    A crash mid-write leaves the original file intact. The permissions of the
+    original file are kept.
+
+    Args:
+        file_path: Path to the file
+        text: New contents of the file
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=file_path.parent,
+        prefix=f".{file_path.name}.",
+        suffix=".temp",
+    )
+
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            f.write(text)
+
+        if file_path.exists():
+            os.chmod(temp_path, file_path.stat().st_mode & 0o7777)
+
+        os.replace(temp_path, file_path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def get_file_stamp(file_path: Path) -> tuple[int, int]:
+    """Gets the modification time and size of a file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Modification time (in nanoseconds) and size (in bytes)
+    """
+    stat = file_path.stat()
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_yml(
+    file_path: str | Path,
+    safe: bool = False,
+) -> Any:
+    """Loads a YAML file, parsing it at most once while it is unchanged.
+
+    Documents are cached per process, keyed on the path and invalidated when the
+    file's modification time or size changes. The cached document is shared, so
+    callers that modify it must write it with ``dump_yml``.
+
+    Args:
+        file_path: Path to the YAML file
+        safe: Whether to load plain Python objects with the (much faster) safe
+            loader, for reading only. Defaults to False.
+
+    Returns:
+        YAML document, round-trip unless ``safe``
+    """
+    path = Path(file_path).resolve()
+    stamp = get_file_stamp(file_path=path)
+    cached = yml_cache.get((path, safe))
+
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    loader = get_safe_yaml() if safe else get_yaml()
+
+    with path.open("r") as f:
+        yml_cache[(path, safe)] = (stamp, loader.load(f))  # pyright: ignore
+
+    return yml_cache[(path, safe)][1]
+
+
+def dump_yml(
+    data: Any,
+    file_path: str | Path,
+) -> None:
+    """Writes a YAML document to a file, keeping the document cache up to date.
+
+    Args:
+        data: Round-trip YAML document
+        file_path: Path to the YAML file
+    """
+    path = Path(file_path).resolve()
+
+    yml_cache.pop((path, True), None)
+
+    try:
+        stream = io.StringIO()
+        get_yaml().dump(data, stream)  # pyright: ignore
+        write_atomic(file_path=path, text=stream.getvalue())
+    except BaseException:
+        # the cached document may no longer match the file
+        yml_cache.pop((path, False), None)
+        raise
+
+    yml_cache[(path, False)] = (get_file_stamp(file_path=path), data)
+
+
+def find_scalar_node(
+    node: Node | None,
+    keys: Sequence[str | int],
+) -> ScalarNode | None:
+    """Finds the scalar node at the end of a path of keys in a composed YAML tree.
+
+    Args:
+        node: Root node
+        keys: Mapping keys and list indexes leading to the scalar
+
+    Returns:
+        Scalar node, None if not found
+    """
+    current: Any = node
+
+    for key in keys:
+        if current is None:
+            return None
+
+        if current.id == "mapping":
+            current = next((v for k, v in current.value if k.value == str(key)), None)
+        elif current.id == "sequence" and isinstance(key, int):
+            current = current.value[key] if key < len(current.value) else None
+        else:
+            return None
+
+    return current if current is not None and current.id == "scalar" else None
+
+
+def set_by_keys(
+    data: Any,
+    keys: Sequence[str | int],
+    value: Any,
+) -> None:
+    """Sets a value in nested mappings and lists.
+
+    Args:
+        data: Document
+        keys: Mapping keys and list indexes leading to the value
+        value: New value
+    """
+    get_by_keys(data=data, keys=keys[:-1])[keys[-1]] = value
+
+
+# edits of a file, new value by the keys leading to it
+Edits = dict[tuple[str | int, ...], str]
+
+
+def is_patch_exact(
+    old_data: Any,
+    new_data: Any,
+    edits: Edits,
+) -> bool:
+    """Checks that a patched document differs from the original only by the edits.
+
+    Args:
+        old_data: Original document
+        new_data: Patched document, modified by the check
+        edits: Edits of the document
+
+    Returns:
+        Whether the edited values are set and everything else is unchanged
+    """
+    try:
+        for keys, new_value in edits.items():
+            if get_by_keys(data=new_data, keys=keys) != new_value:
+                return False
+
+            set_by_keys(
+                data=new_data,
+                keys=keys,
+                value=get_by_keys(data=old_data, keys=keys),
+            )
+    except (KeyError, IndexError, TypeError):
+        return False
+
+    return new_data == old_data
+
+
+def patch_yml_text(
+    text: str,
+    edits: Edits,
+) -> str | None:
+    """Edits scalar values in a YAML document without re-serialising it.
+
+    Only the characters of each value are replaced, keeping its quoting, so the
+    rest of the document is untouched. The document is parsed once to find the
+    values, and the patched document once more to check that only the values
+    changed.
+
+    Args:
+        text: YAML document
+        edits: Edits of the document
+
+    Returns:
+        Patched document, None if the values cannot be patched in place (e.g. block
+        scalars, or a new value would need different quoting)
+    """
+    from ruamel.yaml.error import YAMLError
+
+    safe_yaml = get_safe_yaml()
+
+    try:
+        root = safe_yaml.compose(text)  # pyright: ignore
+    except YAMLError:
+        return None
+
+    if root is None:
+        return None  # empty document
+
+    # build the data from the nodes instead of parsing the text a second time
+    old_data = safe_yaml.constructor.construct_document(root)  # pyright: ignore
+
+    spans: dict[int, tuple[int, str]] = {}  # start to end and replacement
+
+    for keys, new_value in edits.items():
+        node: Any = find_scalar_node(node=root, keys=keys)  # pyright: ignore
+
+        if node is None or node.style not in [None, "", "'", '"']:  # not block
+            return None
+
+        if node.style == "'":
+            replacement = "'" + new_value.replace("'", "''") + "'"
+        elif node.style == '"':
+            escaped = new_value.replace("\\", "\\\\").replace('"', '\\"')
+            replacement = f'"{escaped}"'
+        else:
+            replacement = new_value
+
+        spans[node.start_mark.index] = (node.end_mark.index, replacement)
+
+    # replace from the end of the document so the earlier offsets stay valid
+    for start, (end, replacement) in sorted(spans.items(), reverse=True):
+        text = text[:start] + replacement + text[end:]
+
+    try:
+        new_data = safe_yaml.load(text)  # pyright: ignore
+    except YAMLError:
+        return None
+
+    if not is_patch_exact(old_data=old_data, new_data=new_data, edits=edits):
+        return None
+
+    return text
+
+
+def patch_toml_text(
+    text: str,
+    edits: Edits,
+) -> str | None:
+    """Edits string values in a TOML document without re-serialising it.
+
+    Each string literal is found by its exact text, which must occur only once in
+    the document. The patched document is parsed again to check that only the
+    values changed.
+
+    Args:
+        text: TOML document
+        edits: Edits of the document
+
+    Returns:
+        Patched document, None if the values cannot be patched in place
+    """
+    try:
+        old_data = tomllib.loads(text)
+    except tomllib.TOMLDecodeError:
+        return None
+
+    for keys, new_value in edits.items():
+        try:
+            old_value = get_by_keys(data=old_data, keys=keys)
+        except (KeyError, IndexError, TypeError):
+            return None
+
+        if not isinstance(old_value, str) or any(
+            char in value for value in [old_value, new_value] for char in "\\\"'"
+        ):
+            return None  # needs escaping
+
+        literals = [
+            (f"{quote}{old_value}{quote}", f"{quote}{new_value}{quote}")
+            for quote in "\"'"
+        ]
+
+        if sum(text.count(old) for old, _ in literals) != 1:
+            return None
+
+        for old, new in literals:
+            text = text.replace(old, new)
+
+    try:
+        new_data = tomllib.loads(text)
+    except tomllib.TOMLDecodeError:
+        return None
+
+    if not is_patch_exact(old_data=old_data, new_data=new_data, edits=edits):
+        return None
+
+    return text
+
+
+def render_edits(
+    file_path: Path,
+    edits: Edits,
+    text: str | None = None,
+) -> str:
+    """Applies edits to the contents of a YAML or TOML file, without writing it.
+
+    The values are patched in place where possible, otherwise the document is
+    re-serialised with ruamel (YAML) or tomlkit (TOML), preserving its formatting.
+
+    Args:
+        file_path: Path to the file
+        edits: Edits of the file
+        text: Current contents of the file, read from ``file_path`` if None.
+            Defaults to None.
+
+    Returns:
+        New contents of the file
+    """
+    if text is None:
+        with file_path.open("r", newline="") as f:
+            text = f.read()
+
+    if file_path.suffix == ".toml":
+        patched = patch_toml_text(text=text, edits=edits)
+
+        if patched is not None:
+            return patched
+
+        # tomlkit preserves the formatting, only needed when rewriting
+        import tomlkit
+
+        toml_doc = tomlkit.parse(text)
+
+        for keys, new_value in edits.items():
+            set_by_keys(data=toml_doc, keys=keys, value=new_value)
+
+        return tomlkit.dumps(toml_doc)  # pyright: ignore
+
+    patched = patch_yml_text(text=text, edits=edits)
+
+    if patched is not None:
+        return patched
+
+    yaml = get_yaml()
+    yml_doc: Any = yaml.load(text)  # pyright: ignore
+
+    for keys, new_value in edits.items():
+        set_by_keys(data=yml_doc, keys=keys, value=new_value)
+
+    stream = io.StringIO()
+    yaml.dump(yml_doc, stream)  # pyright: ignore
+
+    return stream.getvalue()
+
+
+def write_edits(edits: dict[Path, Edits]) -> list[Path]:
+    """Applies edits to many files, writing each file once.
+
+    All the new contents are rendered before anything is written, so if an edit
+    fails no file is changed.
+
+    Args:
+        edits: Edits by file
+
+    Returns:
+        Paths of the files written
+    """
+    texts = {
+        file_path: render_edits(file_path=file_path, edits=file_edits)
+        for file_path, file_edits in edits.items()
+        if len(file_edits) > 0
+    }
+
+    for file_path, text in texts.items():
+        path = file_path.resolve()
+        write_atomic(file_path=path, text=text)
+        yml_cache.pop((path, True), None)
+        yml_cache.pop((path, False), None)
+
+    return list(texts)
+
+
+def location_matches(
+    location: Location,
+    matches: Callable[[Any, str | int], bool],
+) -> bool:
+    """Checks whether a location still holds the expected value.
+
+    Args:
+        location: Location of the value
+        matches: Checks the value, given the parent mapping (or list) and the key of
+            the value
+
+    Returns:
+        False if the location is stale, i.e. the file no longer holds a matching
+        value there
+    """
+    try:
+        if location.file_path.suffix == ".toml":
+            with location.file_path.open("rb") as f:
+                data = tomllib.load(f)
+        else:
+            data = load_yml(file_path=location.file_path, safe=True)
+
+        parent = get_by_keys(data=data, keys=location.keys[:-1])
+
+        return matches(parent, location.keys[-1])
+    except (KeyError, IndexError, TypeError, OSError):
+        return False
+
+
+def find_variable_in_file(
+    file_path: str | Path,
     variable_name: str,
-) -> list[str]:
-    """Function to extract all values of a particular variable from a YAML file.
+) -> list[tuple[str, Location]]:
+    """Finds all values of a particular variable in a YAML file, and where they are.
 
     Args:
-        file_path: _description_
-        variable_name: _description_
+        file_path: Path to the YAML file
+        variable_name: Name of the variable
 
     Returns:
-        _description_
+        Values of the variable and their locations
     """
-    with Path(file_path).open("r") as f:
-        data: Any = yaml.load(f)  # pyright: ignore
+    data = load_yml(file_path=file_path, safe=True)
 
     # use a stack to process items without recursion
-    stack: list[Any] = [data]  # stack to hold data elements to process
-    variable_list: list[str] = []
+    stack: list[tuple[Any, tuple[str | int, ...]]] = [(data, ())]  # items and keys
+    found: list[tuple[str, Location]] = []
 
     while stack:
-        current = stack.pop()
+        current, keys = stack.pop()
 
         if isinstance(current, dict):  # if the current item is a dictionary
             for key, value in current.items():  # pyright: ignore[reportUnknownVariableType]
@@ -42,30 +530,49 @@ def extract_variable_from_file(
                     value,
                     str,
                 ):  # check key and type
-                    variable_list.append(value)
+                    location = Location(file_path=Path(file_path), keys=(*keys, key))  # pyright: ignore[reportUnknownArgumentType]
+                    found.append((value, location))
                 elif isinstance(value, dict | list):  # add nested structures to stack
-                    stack.append(value)
+                    stack.append((value, (*keys, key)))  # pyright: ignore[reportUnknownArgumentType]
         elif isinstance(current, list):  # if the current item is a list
             # add all elements to the stack
-            stack.extend(current)  # pyright: ignore[reportUnknownArgumentType]
+            stack.extend((item, (*keys, idx)) for idx, item in enumerate(current))  # pyright: ignore[reportUnknownArgumentType, reportUnknownVariableType]
 
-    return variable_list
+    return found
 
 
-def extract_from_yml_directory(
-    gha_path: Path,
+def extract_variable_from_file(
+    file_path: str,
     variable_name: str,
 ) -> list[str]:
-    """Function to process all YAML files in a directory.
+    """Function to extract all values of a particular variable from a YAML file.
 
     Args:
-        gha_path: _description_
+        file_path: _description_
         variable_name: _description_
 
     Returns:
         _description_
     """
-    values: list[str] = []
+    found = find_variable_in_file(file_path=file_path, variable_name=variable_name)
+
+    return [value for value, _ in found]
+
+
+def find_in_yml_directory(
+    gha_path: Path,
+    variable_name: str,
+) -> list[tuple[str, Location]]:
+    """Finds all values of a particular variable in the YAML files of a directory.
+
+    Args:
+        gha_path: Path to the directory
+        variable_name: Name of the variable
+
+    Returns:
+        Values of the variable and their locations
+    """
+    found: list[tuple[str, Location]] = []
 
     # Find all .yml and .yaml files in the directory
     yaml_files = glob.glob(os.path.join(gha_path, "*.yml")) + glob.glob(
@@ -73,245 +580,159 @@ def extract_from_yml_directory(
     )
 
     for file_path in yaml_files:
-        file_values = extract_variable_from_file(
-            file_path=file_path,
-            variable_name=variable_name,
+        found.extend(
+            find_variable_in_file(file_path=file_path, variable_name=variable_name),
         )
-        values.extend(file_values)
 
-    return values
+    return found
 
 
-def parse_pre_commit_config(file_path: Path) -> list[dict[str, str]]:
-    """_summary_.
+def extract_from_yml_directory(
+    gha_path: Path,
+    variable_name: str,
+) -> list[str]:
+    """Function to process all YAML files in a directory.
 
     Args:
-        file_path: _description_
+        gha_path: _description_
+        variable_name: _description_
 
     Returns:
         _description_
     """
-    with file_path.open("r") as f:
-        data = yaml.load(f)  # pyright: ignore
+    found = find_in_yml_directory(gha_path=gha_path, variable_name=variable_name)
+
+    return [value for value, _ in found]
 
-    repos_info: list[dict[str, str]] = []
+
+def find_pre_commit_repos(file_path: Path) -> list[tuple[dict[str, str], Location]]:
+    """Finds the repos of a pre-commit config, and where their revs are.
+
+    Args:
+        file_path: Path to the pre-commit config
+
+    Returns:
+        Repo URL and rev of each repo, and the location of the rev
+    """
+    data = load_yml(file_path=file_path, safe=True)
+
+    repos_info: list[tuple[dict[str, str], Location]] = []
 
     # Extract repos and their information
     if "repos" in data and isinstance(data["repos"], list):
-        for repo_entry in data["repos"]:  # pyright: ignore
+        for idx, repo_entry in enumerate(data["repos"]):  # pyright: ignore
             if isinstance(repo_entry, dict):
                 repo_url = repo_entry.get("repo")  # pyright:ignore
                 rev = repo_entry.get("rev")  # pyright:ignore
                 if repo_url and rev:
-                    repos_info.append({"repo": repo_url, "rev": rev})
+                    location = Location(file_path=file_path, keys=("repos", idx, "rev"))
+                    repos_info.append(({"repo": repo_url, "rev": rev}, location))
 
     return repos_info
 
 
-def update_uv(
-    gha_path: Path,
-    new_version: str,
-) -> None:
-    """_summary_.
-
-    Args:
-        gha_path: _description_
-        new_version: _description_
-    """
-    # Find all .yml and .yaml files in the directory
-    yaml_files = glob.glob(os.path.join(gha_path, "*.yml")) + glob.glob(
-        os.path.join(gha_path, "*.yaml"),
-    )
-
-    for file_path in yaml_files:
-        with Path(file_path).open("r") as f:
-            data: dict[str, Any] = yaml.load(f)  # pyright: ignore
-
-        try:
-            data["env"]["UV_VERSION"] = new_version
-
-            # temp_file = Path(file_path).with_suffix(".temp")
-            with Path(file_path).open("w") as temp_f:
-                yaml.dump(data, temp_f)  # pyright: ignore
-        except KeyError:
-            continue
-
-
-def update_github_workflows(
-    gha_path: Path,
-    dependency: GitHubDependency,
-    new_version: str,
-) -> None:
+def parse_pre_commit_config(file_path: Path) -> list[dict[str, str]]:
     """_summary_.
 
     Args:
-        gha_path: _description_
-        dependency: _description_
-        new_version: _description_
-    """
-    # Find all .yml and .yaml files in the directory
-    yaml_files = glob.glob(os.path.join(gha_path, "*.yml")) + glob.glob(
-        os.path.join(gha_path, "*.yaml"),
-    )
-
-    for file_path in yaml_files:
-        with Path(file_path).open("r") as f:
-            data: dict[str, Any] = yaml.load(f)  # pyright: ignore
-
-        if dependency.full_version is not None:
-            prefix = dependency.full_version.split("/")[0]
-            new_req = f"{dependency.package_name}@{prefix}/v{new_version}"
-        else:
-            new_req = f"{dependency.package_name}@v{new_version}"
-
-        changed = update_github_action_dependency(
-            d=data,  # pyright: ignore
-            dependency=dependency.package_name,
-            new_requirement=new_req,
-        )
-
-        if changed:
-            # temp_file = Path(file_path).with_suffix(".temp")
-            with Path(file_path).open("w") as temp_f:
-                yaml.dump(data, temp_f)  # pyright: ignore
-
-
-def update_github_action_dependency(
-    d: dict[str, Any],
-    dependency: str,
-    new_requirement: str,
-    changed: bool = False,
-) -> bool:
-    """Recursively replace values of a given key in a nested dictionary.
-
-    Args:
-        d: _description_
-        dependency: _description_
-        new_requirement: _description_
-        changed: _description_
+        file_path: _description_
 
     Returns:
-        If the value has been replaced in any level of recursion
+        _description_
     """
-    if isinstance(d, dict):  # pyright: ignore
-        for key, value in d.items():
-            if key == "uses":
-                if "@" in value:
-                    package_name, _ = value.split("@", maxsplit=1)
-                else:
-                    package_name = value
-
-                if package_name == dependency:
-                    d[key] = new_requirement
-                    changed = True
-            elif isinstance(value, dict):
-                changed = update_github_action_dependency(
-                    value,  # pyright: ignore
-                    dependency,
-                    new_requirement,
-                    changed,
-                )
-            elif isinstance(value, list):
-                for item in value:  # pyright: ignore
-                    changed = update_github_action_dependency(
-                        item,  # pyright: ignore
-                        dependency,
-                        new_requirement,
-                        changed,
-                    )
-
-    return changed
+    return [info for info, _ in find_pre_commit_repos(file_path=file_path)]
 
 
-def update_pre_commit(
-    file_path: Path,
+def build_action_requirement(
     dependency: GitHubDependency,
     new_version: str,
-) -> None:
-    """_summary_.
+) -> str:
+    """Builds the ``uses`` value of a GitHub action at a new major version.
 
     Args:
-        file_path: _description_
-        dependency: _description_
-        new_version: _description_
-    """
-    with Path(file_path).open("r") as f:
-        data: dict[str, Any] = yaml.load(f)  # pyright: ignore
-
-    # get repo url
-    url = f"https://github.com/{dependency.owner}/{dependency.repo}"
+        dependency: GitHub action
+        new_version: New major version
 
-    for repo in data["repos"]:  # pyright: ignore
-        if repo["repo"] == url:
-            v_str = "v" if dependency.has_v else ""
-            repo["rev"] = f"{v_str}{new_version}"
+    Returns:
+        ``uses`` value, e.g. ``actions/checkout@v4``
+    """
+    # handle branch name in tag e.g. pypa/gh-action-pypi-publish@release/v1
+    if dependency.full_version is not None:
+        prefix = dependency.full_version.split("/")[0]
+        return f"{dependency.package_name}@{prefix}/v{new_version}"
 
-    # temp_file = Path(file_path).with_suffix(".temp")
-    with Path(file_path).open("w") as temp_f:
-        yaml.dump(data, temp_f)  # pyright: ignore
+    return f"{dependency.package_name}@v{new_version}"
 
 
 def run_shell_command(
     shell_args: list[str],
     suppress_errors: bool = False,
+    cwd: Path | None = None,
+    stdin: str | bytes | None = None,
+    env: dict[str, str] | None = None,
+    binary: bool = False,
 ) -> Any:
     """_summary_.
 
     Args:
         shell_args: _description_
         suppress_errors: _description_
+        cwd: Directory to run the command in, the current directory if None.
+            Defaults to None.
+        stdin: Text (bytes if ``binary``) passed to the standard input of the
+            command. Defaults to None.
+        env: Environment variables set in addition to the current environment.
+            Defaults to None.
+        binary: Whether the standard input and output are bytes, e.g. file contents
+            whose line endings must be kept as they are. Otherwise they are text, with
+            universal newlines. Defaults to False.
 
     Returns:
         _description_
     """
-    if suppress_errors:
-        res = subprocess.run(  # noqa: S603
-            shell_args,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-    else:
-        try:
-            res = subprocess.run(shell_args, check=True, capture_output=True, text=True)  # noqa: S603
-        except subprocess.CalledProcessError as e:
-            msg = f"Command failed with return code {e.returncode}.\n"
-            msg += f"Error output: {e.stderr}"
-            raise RuntimeError(msg) from e
+    full_env = None if env is None else {**os.environ, **env}
+
+    with tracing.span(
+        " ".join(shell_args[:2]),
+        category="subprocess",
+        command=shell_args,
+    ):
+        if suppress_errors:
+            res = subprocess.run(  # noqa: S603
+                shell_args,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=cwd,
+                input=stdin,
+                text=not binary,
+                env=full_env,
+            )
+        else:
+            try:
+                res = subprocess.run(  # noqa: S603
+                    shell_args,
+                    check=True,
+                    capture_output=True,
+                    text=not binary,
+                    cwd=cwd,
+                    input=stdin,
+                    env=full_env,
+                )
+            except subprocess.CalledProcessError as e:
+                msg = f"Command failed with return code {e.returncode}.\n"
+                stderr = e.stderr.decode() if binary else e.stderr
+                msg += f"Error output: {stderr}"
+                raise RuntimeError(msg) from e
 
     return res
 
 
-def get_git_status() -> list[str]:
-    """Get the list of modified or untracked files from git status.
-
-    Returns:
-        _description_
-    """
-    result = run_shell_command(["git", "status", "-s"])
-
-    # parse the result to get the list of files
-    changed_files: list[str] = []
-
-    for line in result.stdout.strip().split("\n"):
-        if len(line) > 0:
-            status, file_path = line.split(maxsplit=1)  # status and file name
-
-            if status in ["M", "A", "D"]:  # modified, added, or deleted
-                changed_files.append(file_path)
-
-    return changed_files
-
-
 def format_all_yml_files() -> None:
     """Formats the workflow and pre-commit config yaml files."""
     # pre-commit
     pre_commit_path = Path(".pre-commit-config.yaml")
 
-    with pre_commit_path.open("r") as f:
-        data: dict[str, Any] = yaml.load(f)  # pyright: ignore
-
-    with pre_commit_path.open("w") as temp_f:
-        yaml.dump(data, temp_f)  # pyright: ignore
+    dump_yml(data=load_yml(file_path=pre_commit_path), file_path=pre_commit_path)
 
     # workflows
     workflows_dir = Path("") / ".github" / "workflows"
@@ -321,8 +742,4 @@ def format_all_yml_files() -> None:
     )
 
     for file_path in yaml_files:
-        with Path(file_path).open("r") as f:
-            data: dict[str, Any] = yaml.load(f)  # pyright: ignore
-
-        with Path(file_path).open("w") as temp_f:
-            yaml.dump(data, temp_f)  # pyright: ignore
+        dump_yml(data=load_yml(file_path=file_path), file_path=file_path)